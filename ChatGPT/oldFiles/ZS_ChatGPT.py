@@ -9,6 +9,14 @@ from difflib import get_close_matches
 import time
 from datetime import datetime
 import os
+import sys
+
+# Shared codification helpers live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from codification.cache import RESPONSE_CACHE, cached_post, replicate_backend
+from codification.logs import log_path, log_prompt, setup_logging
+from codification.client import post_json
+from codification.scoring import OPENAI_LOGPROB_FIELDS, has_openai_label, openai_label_probability, probability_sheet
 
 Starting_time = datetime.now()
 print(f"\n⏰ Starting time: '{Starting_time}'")
@@ -16,9 +24,14 @@ print(f"\n⏰ Starting time: '{Starting_time}'")
 MAX_RETRIES = 3
 API_URL = "https://api.openai.com/v1/chat/completions"
 API_KEY = "" #API KEY
+SCORE = False  # Set to True to also store P("1") from the answer logprobs in the "Probability" sheet
 
 # Load the Excel file
 file_path = '/Users/sabanov/Desktop/14_2_2025/ChatGPT.xlsx'
+# Every run is an intentional replicate: answers are sampled again, never
+# replayed from the response cache, and stored under this workbook only
+REPLICATE_BACKEND = replicate_backend("openai", file_path)
+setup_logging(log_path(file_path))
 
 # Load sheets using pandas
 codes_sheet = pd.read_excel(file_path, sheet_name="Codes", header=None)
@@ -61,6 +74,7 @@ if "Zero" not in workbook.sheetnames:
     raise ValueError("❌ Sheet 'Coding' not found in the Excel file!")
 
 workbook_sheet = workbook["Zero"]
+probabilities_sheet = probability_sheet(workbook, "Zero") if SCORE else None
 
 # Define column indices  title_col category_col   name_col   description_col      embded_col
 title_col = 0
@@ -92,16 +106,15 @@ for code_idx, code_col in enumerate(code_columns):
     }
 
     # Send a system reset request to gpt-4-turbo before starting a new column
-    response = requests.post(
-        API_URL, 
-        headers={"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}, 
-        json=reset_data
-    )
-
-    if response.status_code == 200:
+    try:
+        post_json(
+            API_URL,
+            reset_data,
+            headers={"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
+        )
         print(f"🧹 gpt-4-turbo context cleared before processing column {code_col} ({matched_code_name})")
-    else:
-        print(f"⚠️ Failed to reset gpt-4-turbo context: {response.status_code} - {response.text}")
+    except (requests.exceptions.RequestException, json.JSONDecodeError) as reset_err:
+        print(f"⚠️ Failed to reset gpt-4-turbo context: {reset_err}")
 
 
     # Process each row
@@ -133,7 +146,7 @@ for code_idx, code_col in enumerate(code_columns):
             f"Text: `{text_for_prompt}`"
         )
 
-        print(f"\n🤖 gpt-4-turbo prompt: {prompt}\n")
+        log_prompt(prompt, i, matched_code_name)
 
         # 🔹 Ensure proper JSON formatting for API request
         data = {
@@ -142,20 +155,24 @@ for code_idx, code_col in enumerate(code_columns):
             "temperature": 0.0,
             "stream": False
         }
+        if SCORE:
+            # One answer token with its log-probabilities
+            data.update(OPENAI_LOGPROB_FIELDS)
 
         attempt = 0
         while attempt < MAX_RETRIES:
             try:
-                # Send the request to the OpenAI API
-                response = requests.post(
+                # Send the request to the OpenAI API (answers without a 0/1 label are not cached)
+                response_json = cached_post(
                     API_URL,
+                    data,
                     headers={"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"},
-                    json=data
+                    backend=REPLICATE_BACKEND,
+                    bypass=True,
+                    validate=has_openai_label
                 )
-                response.raise_for_status()  # Raise an error for HTTP issues
 
                 # ✅ Correct API response handling
-                response_json = response.json()
                 api_response = response_json.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
 
                 # Validate response format
@@ -168,6 +185,8 @@ for code_idx, code_col in enumerate(code_columns):
 
                 # Write the result to the Excel sheet
                 workbook_sheet.cell(row=i+1, column=code_col+1, value=result_value)
+                if SCORE:
+                    probabilities_sheet.cell(row=i+1, column=code_col+1, value=openai_label_probability(response_json))
                 workbook.save(file_path)  # 🔹 Ensure changes are written to the file
                 print(f"✅ Successfully written to Excel at row {i+1}, column {code_col+1}")
                 print(f"\n⏳ Starting time: '{Starting_time}'")
@@ -194,6 +213,7 @@ for code_idx, code_col in enumerate(code_columns):
 # 🔹 Ensure the workbook is properly saved and closed at the end
 workbook.save(file_path)
 workbook.close()
+RESPONSE_CACHE.report()
 Finishing_time = datetime.now()
 print("\n✅ Results successfully written to the Excel file.")
 print(f"\n⏳ Starting time: '{Starting_time}'")
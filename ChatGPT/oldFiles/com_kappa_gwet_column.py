@@ -1,107 +1,67 @@
+import os
+import sys
 import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
-from sklearn.metrics import cohen_kappa_score
-import numpy as np
 
-# Function to calculate GWET's AC1
-def gwet_ac1(human_ratings, llama_ratings):
-    n = len(human_ratings)
-    if n == 0:
-        return np.nan
+# Shared codification helpers live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from codification.agreement import agreement_table, bootstrap_intervals, interpret_kappa, label_matrix
 
-    agreement = np.sum(human_ratings == llama_ratings) / n
-    marginals_human = pd.Series(human_ratings).value_counts(normalize=True)
-    marginals_llama = pd.Series(llama_ratings).value_counts(normalize=True)
-    pe = np.sum(marginals_human * marginals_llama)
-    ac1 = (agreement - pe) / (1 - pe) if (1 - pe) != 0 else np.nan
-    return ac1
+BOOTSTRAP_RESAMPLES = 2000  # Resamples for the 95% confidence intervals of kappa and AC1
+BOOTSTRAP_WORKERS = None    # Set to the number of processes to spread the constructs over
 
-# Load the Excel file
+# Comparison workbook: human coding in the 2nd sheet, model coding and comparison in the 4th
 file_path = '/Users/sabanov/Desktop/14_2_2025/Comparison/comparison.xlsx'
-human = pd.read_excel(file_path, sheet_name=1, header=None)
-llama = pd.read_excel(file_path, sheet_name=3, header=None)
 
-# Load the workbook and the specific sheet
-workbook = load_workbook(file_path)
-comparison_sheet = workbook.worksheets[3]  # Assuming comparison sheet is the 4th sheet (index 3)
+def main():
+    # Load the Excel file
+    human = pd.read_excel(file_path, sheet_name=1, header=None)
+    llama = pd.read_excel(file_path, sheet_name=3, header=None)
 
-# Define the fill colors
-green_fill = PatternFill(start_color="ceffce", end_color="ceffce", fill_type="solid")
-red_fill = PatternFill(start_color="fd9f9f", end_color="fd9f9f", fill_type="solid")
+    # Load the workbook and the specific sheet
+    workbook = load_workbook(file_path)
+    comparison_sheet = workbook.worksheets[3]  # Assuming comparison sheet is the 4th sheet (index 3)
 
-# Define column range
-start_col = 6  # Column E (0-based index for E is 4)
-end_col = 18   # Column AG (0-based index for AG is 32)
+    # Define the fill colors
+    green_fill = PatternFill(start_color="ceffce", end_color="ceffce", fill_type="solid")
+    red_fill = PatternFill(start_color="fd9f9f", end_color="fd9f9f", fill_type="solid")
 
-# Process each column separately
-for col in range(start_col, end_col + 1):  # From E to AG
-    green_count = 0
-    red_count = 0
+    # Define column range
+    start_col = 6  # Column G (0-based index)
+    end_col = 18   # Column S (0-based index)
+    columns = list(range(start_col, end_col + 1))
+    rows = list(range(1, 38))  # Rows 2 to 38 (1-based index)
 
-    # Prepare lists for Cohen's Kappa
-    human_ratings = []
-    llama_ratings = []
-
-    for row in range(1, 38):  # Rows 2 to 505 (1-based index)
-        human_value = human.iloc[row, col]
-        llama_value = llama.iloc[row, col]
-
-        human_value = pd.to_numeric(human_value, errors='coerce')
-        llama_value = pd.to_numeric(llama_value, errors='coerce')
-
-        if pd.isna(human_value):
-            human_value = 0
-
-        if not pd.isna(llama_value):
-            human_ratings.append(human_value)
-            llama_ratings.append(llama_value)
-
-        cell = comparison_sheet.cell(row=row + 1, column=col + 1)
-        if human_value == llama_value:
-            cell.fill = green_fill
-            green_count += 1
-        else:
-            cell.fill = red_fill
-            red_count += 1
-
-    # Convert to numpy arrays
-    human_ratings = np.array(human_ratings)
-    llama_ratings = np.array(llama_ratings)
-
-    # Calculate Cohen's Kappa
-    kappa = cohen_kappa_score(human_ratings, llama_ratings) if len(human_ratings) > 0 else np.nan
-
-    # Calculate GWET's AC1
-    #ac1 = gwet_ac1(human_ratings, llama_ratings)
-
-    
-
-    # Interpret Kappa
-    if pd.isna(kappa):
-        interpretation = "Not enough data or insufficient unique labels"
-    elif kappa < 0:
-        interpretation = "Less than chance agreement"
-    elif kappa <= 0.20:
-        interpretation = "Slight agreement"
-    elif kappa <= 0.40:
-        interpretation = "Fair agreement"
-    elif kappa <= 0.60:
-        interpretation = "Moderate agreement"
-    elif kappa <= 0.80:
-        interpretation = "Substantial agreement"
-    else:
-        interpretation = "Almost perfect agreement"
+    # Label matrices (rows x constructs), loaded once
+    human_labels = label_matrix(human, rows, columns)
+    llama_labels = label_matrix(llama, rows, columns)
 
+    # Kappa, AC1, percent agreement and agree/disagree counts of every construct
+    results = agreement_table(human_labels, llama_labels)
+    intervals = bootstrap_intervals(human_labels, llama_labels, resamples=BOOTSTRAP_RESAMPLES,
+                                    workers=BOOTSTRAP_WORKERS)
 
+    # Color each compared cell
+    matches = results["matches"]
+    for r, row in enumerate(rows):
+        for c, col in enumerate(columns):
+            comparison_sheet.cell(row=row + 1, column=col + 1).fill = green_fill if matches[r, c] else red_fill
 
     # Write the results to the sheet
-    comparison_sheet.cell(row=40, column=col + 1).value = f"{kappa}"
-    comparison_sheet.cell(row=41, column=col + 1).value = f"{interpretation}"
-    #comparison_sheet.cell(row=42, column=col + 1).value = f"{ac1}"
-    comparison_sheet.cell(row=43, column=col + 1).value = f"{green_count}"
-    comparison_sheet.cell(row=44, column=col + 1).value = f"{red_count}"
-
-# Save the workbook
-workbook.save(file_path)
-print("Processing complete. Results saved to the Excel file.")
+    for c, col in enumerate(columns):
+        comparison_sheet.cell(row=40, column=col + 1).value = f"{results['kappa'][c]}"
+        comparison_sheet.cell(row=41, column=col + 1).value = f"{interpret_kappa(results['kappa'][c])}"
+        comparison_sheet.cell(row=42, column=col + 1).value = f"{results['ac1'][c]}"
+        comparison_sheet.cell(row=43, column=col + 1).value = f"{results['agree'][c]}"
+        comparison_sheet.cell(row=44, column=col + 1).value = f"{results['disagree'][c]}"
+        comparison_sheet.cell(row=45, column=col + 1).value = f"{results['percent'][c]}"
+        comparison_sheet.cell(row=46, column=col + 1).value = f"[{intervals['kappa'][c][0]:.3f}, {intervals['kappa'][c][1]:.3f}]"
+        comparison_sheet.cell(row=47, column=col + 1).value = f"[{intervals['ac1'][c][0]:.3f}, {intervals['ac1'][c][1]:.3f}]"
+
+    # Save the workbook
+    workbook.save(file_path)
+    print("Processing complete. Results saved to the Excel file.")
+
+if __name__ == "__main__":
+    main()
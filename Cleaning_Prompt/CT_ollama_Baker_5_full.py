@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 import json
 import requests
@@ -8,6 +9,14 @@ from datetime import datetime
 from openpyxl import load_workbook
 from difflib import get_close_matches
 
+# Shared codification helpers live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from codification.cache import RESPONSE_CACHE, cached_post, replicate_backend
+from codification.logs import log_path, log_prompt, setup_logging
+from codification.ollama import has_label
+from codification.sink import ResultSink
+from codification.probe import ContextReset
+
 # Enable GPU usage for Ollama (if supported)
 os.environ["OLLAMA_USE_CUDA"] = "1"
 
@@ -15,10 +24,17 @@ os.environ["OLLAMA_USE_CUDA"] = "1"
 MAX_RETRIES = 3
 API_URL = "http://localhost:11434/api/generate"
 EXCEL_FILE_PATH = "/home/msaban/ChusCodification/Context1.xlsx"
+# Every run is an intentional replicate: answers are sampled again, never
+# replayed from the response cache, and stored under this workbook only
+REPLICATE_BACKEND = replicate_backend("ollama", EXCEL_FILE_PATH)
 
 def main():
     start_time = datetime.now()
     print(f"\n⏳ Script started at: {start_time}")
+    setup_logging(log_path(EXCEL_FILE_PATH))
+
+    # Probe once whether the server keeps any state between calls
+    context_reset = ContextReset(API_URL)
 
     # Load the Excel file
     codes_sheet = pd.read_excel(EXCEL_FILE_PATH, sheet_name="Codes", header=None)
@@ -49,6 +65,8 @@ def main():
     if "Codification" not in workbook.sheetnames:
         raise ValueError("❌ Sheet 'Codification' not found in the Excel file!")
     workbook_sheet = workbook["Codification"]
+    # Answers are buffered and saved in batches (see codification/sink.py)
+    sink = ResultSink(workbook, EXCEL_FILE_PATH)
 
     # Column indices (0-based in pandas)
     title_col = 0       # Lesson title
@@ -100,7 +118,7 @@ def main():
                 f"Text: `{text_for_prompt}`"
             )
 
-            print(f"\n🤖 Ollama System Message: {prompt}\n")
+            log_prompt(prompt, i, matched_code_name)
 
             # Prepare data payload for the request
             data_payload = {
@@ -111,22 +129,22 @@ def main():
             }
 
             # Attempt to get a valid response from Ollama
-            result_value = send_to_ollama(data_payload, i, matched_code_name, workbook, workbook_sheet, code_col)
+            result_value = send_to_ollama(data_payload, i, matched_code_name)
             
             print(f"📝 Row {i+1} - Code '{matched_code_name}': API response: {result_value}")
             # Write result to Excel
-            workbook_sheet.cell(row=i+1, column=code_col+1, value=result_value)
-            workbook.save(EXCEL_FILE_PATH)
+            sink.write(workbook_sheet.title, i+1, code_col+1, result_value)
 
             # Optional: A brief pause between requests
             # time.sleep(1)
             # Reset Ollama context at the start of each column
-            reset_ollama_context()
-            print(f"🧹 Ollama context cleared before processing column {code_col} ({matched_code_name})")
+            context_reset.reset()
 
     # Finalize
-    workbook.save(EXCEL_FILE_PATH)
+    sink.close()
     workbook.close()
+    RESPONSE_CACHE.report()
+    context_reset.report()
 
     end_time = datetime.now()
     print("\n✅ Results successfully written to the Excel file.")
@@ -147,32 +165,16 @@ def clean_html(html_text):
     """
     return BeautifulSoup(str(html_text), "html.parser").get_text()
 
-def reset_ollama_context():
-    """
-    Send a system reset request to Ollama, clearing any previous context.
-    """
-    system_prompt = "Forget all previous instructions and start fresh."
-    reset_data = {
-        "model": "llama3.3:70b",
-        "prompt": system_prompt,
-        "temperature": 0.0,
-        "stream": False
-    }
-    try:
-        requests.post(API_URL, headers={'Content-Type': 'application/json'}, json=reset_data)
-    except requests.exceptions.RequestException as e:
-        print(f"⚠️ Failed to reset Ollama context: {e}")
-
-def send_to_ollama(data_payload, row_idx, code_name, workbook, sheet, code_col):
+def send_to_ollama(data_payload, row_idx, code_name):
     """
     Send 'data_payload' to the Ollama API, retrying up to MAX_RETRIES times.
     Returns a single-character response ('0' or '1') or 'Error' if unsuccessful.
     """
     for attempt in range(MAX_RETRIES):
         try:
-            response = requests.post(API_URL, headers={'Content-Type': 'application/json'}, json=data_payload)
-            response.raise_for_status()
-            response_json = response.json()
+            # Answers without a 0/1 label are not cached
+            response_json = cached_post(API_URL, data_payload, backend=REPLICATE_BACKEND, bypass=True,
+                                        validate=has_label)
             api_response = response_json.get("response", "").strip()
 
             # Validate Ollama response
@@ -192,9 +194,7 @@ def send_to_ollama(data_payload, row_idx, code_name, workbook, sheet, code_col):
         if attempt < MAX_RETRIES - 1:
             time.sleep(5)
         else:
-            # On final failure, write "Error" to Excel
-            sheet.cell(row=row_idx+1, column=code_col+1, value="Error")
-            workbook.save(EXCEL_FILE_PATH)
+            # On final failure, main() writes "Error" to Excel
             print(f"🚨 Max retries reached for row {row_idx+1}. Moving to next item.")
             return "Error"
 
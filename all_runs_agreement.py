@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from codification.agreement import fleiss_kappa, pairwise_agreement
+from codification.runs import REPO_DIR, group_runs, load_runs, replicate_groups, result_files
+
+# Output workbook (override with the first command line argument)
+OUTPUT_PATH = os.path.join(REPO_DIR, "all_runs_agreement.xlsx")
+
+
+def matrix_sheet(values, raters, constructs):
+    """
+    Stack the (raters x raters) matrix of every construct into one sheet.
+    """
+    blocks = []
+    for c, construct in enumerate(constructs):
+        block = pd.DataFrame(values[:, :, c], index=raters, columns=raters)
+        block.index = pd.MultiIndex.from_product([[construct], raters], names=["construct", "run"])
+        blocks.append(block)
+    return pd.concat(blocks)
+
+
+def mean_or_nan(values):
+    """
+    Mean of the finite 'values', NaN (without a warning) when there is none.
+    """
+    values = np.asarray(values, dtype=float)
+    return float(np.nanmean(values)) if np.isfinite(values).any() else np.nan
+
+
+def main():
+    output_path = sys.argv[1] if len(sys.argv) > 1 else OUTPUT_PATH
+
+    started = time.perf_counter()
+    paths = result_files()
+    runs = load_runs(paths)
+    loaded = time.perf_counter()
+    print(f"📂 Loaded {len(runs)} result workbooks in {loaded - started:.1f}s")
+
+    datasets = group_runs(runs)
+    sheets = {}
+    run_rows, fleiss_rows = [], []
+    for dataset in datasets:
+        # The human coding is the first rater; missing human labels count as 0
+        raters = ["human"] + dataset.runs
+        human = np.nan_to_num(dataset.human[: dataset.labels.shape[1]])
+        labels = np.concatenate([human[None], dataset.labels])
+        kappa, ac1, percent, n = pairwise_agreement(labels)
+
+        sheets[f"{dataset.name} kappa"] = matrix_sheet(kappa, raters, dataset.constructs)
+        sheets[f"{dataset.name} AC1"] = matrix_sheet(ac1, raters, dataset.constructs)
+        sheets[f"{dataset.name} agreement"] = matrix_sheet(percent, raters, dataset.constructs)
+
+        for r, name in enumerate(dataset.runs):
+            run_rows.append({
+                "dataset": dataset.name,
+                "run": name,
+                "rows": labels.shape[1],
+                "rows labelled": int(dataset.labelled[r]),
+                "mean kappa vs human": mean_or_nan(kappa[0, r + 1]),
+                "mean AC1 vs human": mean_or_nan(ac1[0, r + 1]),
+            })
+
+        for group, indices in replicate_groups(dataset.runs).items():
+            group_kappa, group_n = fleiss_kappa(dataset.labels[indices])
+            row = {"dataset": dataset.name, "replicates": group, "runs": len(indices), "rows": int(group_n.min())}
+            row.update(dict(zip(dataset.constructs, group_kappa)))
+            fleiss_rows.append(row)
+
+    computed = time.perf_counter()
+    print(f"🧮 Computed agreement for {len(datasets)} datasets in {computed - loaded:.2f}s")
+
+    with pd.ExcelWriter(output_path) as writer:
+        pd.DataFrame(run_rows).to_excel(writer, sheet_name="Runs", index=False)
+        pd.DataFrame(fleiss_rows).to_excel(writer, sheet_name="Fleiss", index=False)
+        for name, sheet in sheets.items():
+            sheet.to_excel(writer, sheet_name=name)
+
+    if fleiss_rows:
+        print(pd.DataFrame(fleiss_rows).set_index("replicates").iloc[:, 3:].round(2).to_string())
+    else:
+        print("ℹ️ No replicate runs (e.g. Zero1/Zero2) found: Fleiss' kappa table skipped")
+    print(f"\n✅ Agreement matrices saved to '{output_path}' ({time.perf_counter() - started:.1f}s in total)")
+
+
+if __name__ == "__main__":
+    main()
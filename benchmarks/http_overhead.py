@@ -0,0 +1,82 @@
+"""
+Micro-benchmark of the per-request overhead of our HTTP calls.
+
+Starts a local stub of /api/generate that answers instantly, then times the
+old pattern (a bare requests.post() with stdlib JSON, new TCP connection per
+call) against codification.client.post_json() (pooled keep-alive session,
+orjson when installed). Everything measured is client/transport overhead.
+
+Usage: python benchmarks/http_overhead.py [requests]
+"""
+import os
+import sys
+import json
+import time
+import threading
+import requests
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from codification.client import orjson, post_json
+
+# A prompt about the size of a few-shot coding prompt
+PROMPT = "You are a qualitative coding expert. " * 200
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like Ollama
+    disable_nagle_algorithm = True  # otherwise delayed ACKs add ~40 ms per keep-alive request
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        body = b'{"model":"stub","response":"1","done":true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def bare_post(url, payload):
+    response = requests.post(url, headers={'Content-Type': 'application/json'}, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+def time_calls(post, url, payload, count):
+    post(url, payload)  # warm-up
+    started = time.perf_counter()
+    for _ in range(count):
+        post(url, payload)
+    return (time.perf_counter() - started) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+    payload = {"model": "llama3.3:70b", "prompt": PROMPT, "stream": False}
+
+    before = time_calls(bare_post, url, payload, count)
+    after = time_calls(post_json, url, payload, count)
+    server.shutdown()
+
+    results = {
+        "requests": count,
+        "json": "orjson" if orjson is not None else "json",
+        "bare_requests_post_ms": round(before * 1000, 3),
+        "pooled_post_json_ms": round(after * 1000, 3),
+        "speedup": round(before / after, 2) if after else None,
+    }
+    print(f"⏱️ requests.post(): {results['bare_requests_post_ms']} ms/request")
+    print(f"⏱️ post_json():     {results['pooled_post_json_ms']} ms/request ({results['json']})")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
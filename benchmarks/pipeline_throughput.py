@@ -0,0 +1,240 @@
+"""
+End-to-end throughput benchmark of the coding pipeline around the model.
+
+Generates synthetic workbooks shaped like the Codification/Codes sheets, starts
+the mock Ollama server (codification/mockserver.py) and runs the ZS, FS and
+Context flows of Full/ through run_coding(), each in a fresh process. Reports
+the wall time, cells/second, the time spent per stage (load, clean, prompt,
+request, parse, write; see codification/stages.py) and the peak memory of
+each flow, and saves everything as JSON. With --hosts N, N mock servers are
+started and the requests are spread over them (codification/pool.py).
+
+Usage: python benchmarks/pipeline_throughput.py [--rows 500] [--constructs 13]
+       [--html-chars 2000] [--latency 0.0] [--hosts 1] [--flows ZS FS Context]
+       [--output results.json] [--compare previous.json]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import contextlib
+import importlib.util
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_DIR)
+from codification.mockserver import MockConfig, start_mock_server
+
+# Prompt builders of each flow
+FLOW_SCRIPTS = {
+    "ZS": "Full/ZS_Llama_Demhaic2_Full.py",
+    "FS": "Full/FS_Llama_Demhaic2_Full.py",
+    "Context": "Full/Context_Llama_Demhaic2_Full.py",
+}
+
+CONSTRUCT_NAMES = [
+    "passive learning", "active learning", "constructive learning", "interactive learning",
+    "individual activity", "individual product", "collective activity", "collective product",
+    "orientation", "conceptualisation", "investigation", "conclusion", "discussion",
+]
+HEADER = ["ils_title", "item_category", "item_name", "task_description", "embedded_artifact_description", "Summary"]
+
+WORDS = ("students observe the simulation and record how the spring extension changes with force "
+         "then discuss their hypothesis with a partner before writing a short conclusion about "
+         "light temperature photosynthesis energy circuit vaccine earthquake evolution").split()
+
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+
+
+def random_text(rng, chars):
+    words = []
+    while sum(len(word) + 1 for word in words) < chars:
+        words.append(rng.choice(WORDS))
+    return " ".join(words)
+
+
+def random_html(rng, chars):
+    """
+    HTML of about 'chars' characters, with the tags found in the exported activities.
+    """
+    parts = []
+    while sum(len(part) for part in parts) < chars:
+        text = random_text(rng, rng.randint(40, 200))
+        tag = rng.choice(["p", "p", "strong", "li", "br", "a"])
+        if tag == "br":
+            parts.append(f"{text}<br>")
+        elif tag == "a":
+            parts.append(f'<a href="https://example.org/{rng.randint(0, 9999)}">{text}</a>')
+        else:
+            parts.append(f"<{tag}>{text}</{tag}>")
+    return "".join(parts)
+
+
+def make_workbook(path, rows, constructs, html_chars, seed=42):
+    """
+    Write a synthetic workbook with a "Codes" sheet (name, definition, example)
+    and a "Codification" sheet with 'rows' activities and 'constructs' code columns.
+    """
+    from openpyxl import Workbook
+
+    rng = random.Random(seed)
+    names = [CONSTRUCT_NAMES[c] if c < len(CONSTRUCT_NAMES) else f"construct {c + 1}" for c in range(constructs)]
+
+    workbook = Workbook()
+    codes = workbook.active
+    codes.title = "Codes"
+    codes.append(["Code", "Definition", "Example"])
+    for name in names:
+        codes.append([name, random_text(rng, 300), random_text(rng, 400)])
+
+    codification = workbook.create_sheet("Codification")
+    codification.append(HEADER + names)
+    for i in range(rows):
+        codification.append([
+            f"Lesson {i // 20 + 1}",
+            rng.choice(["Space", "Resource", "App"]),
+            f"Item {i % 20 + 1}",
+            random_html(rng, html_chars),
+            random_html(rng, html_chars // 2),
+            random_text(rng, 300),
+        ] + [None] * constructs)
+    workbook.save(path)
+
+
+def load_flow(flow):
+    """
+    Import the script of 'flow' and return its build_prompt().
+    """
+    spec = importlib.util.spec_from_file_location(f"flow_{flow}", os.path.join(REPO_DIR, FLOW_SCRIPTS[flow]))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.build_prompt
+
+
+def peak_memory_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_flow(flow, excel_path, rows, constructs, max_in_flight, verbose):
+    """
+    Run one flow in this (fresh) process and return its measurements.
+    """
+    from codification.pipeline import run_coding
+    from codification.stages import STAGES
+
+    build_prompt = load_flow(flow)
+    STAGES.reset()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    started = time.perf_counter()
+    with output:
+        run_coding(excel_path, build_prompt, rows=range(1, rows + 1),
+                   code_columns=list(range(6, 6 + constructs)), max_in_flight=max_in_flight, warm_up=False)
+    wall = time.perf_counter() - started
+
+    cells = rows * constructs
+    return {
+        "rows": rows,
+        "cells": cells,
+        "wall_seconds": round(wall, 3),
+        "cells_per_second": round(cells / wall, 1),
+        "rows_per_second": round(rows / wall, 2),
+        "stages": {stage: {"seconds": round(values["seconds"], 4), "calls": values["calls"]}
+                   for stage, values in STAGES.snapshot().items()},
+        "peak_memory_mb": round(peak_memory_mb(), 1),
+    }
+
+
+def compare(results, previous_path):
+    """
+    Print the cells/second change of every flow against a previous result file.
+    """
+    with open(previous_path) as f:
+        previous = json.load(f)
+    for flow, result in results["flows"].items():
+        before = previous.get("flows", {}).get(flow)
+        if before:
+            ratio = result["cells_per_second"] / before["cells_per_second"]
+            print(f"📈 {flow}: {before['cells_per_second']} → {result['cells_per_second']} cells/s ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput benchmark of the coding pipeline against a mock backend")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--constructs", type=int, default=13)
+    parser.add_argument("--html-chars", type=int, default=2000, help="size of each activity description")
+    parser.add_argument("--flows", nargs="+", choices=list(FLOW_SCRIPTS), default=list(FLOW_SCRIPTS))
+    parser.add_argument("--latency", type=float, default=0.0, help="mock seconds per request")
+    parser.add_argument("--num-parallel", type=int, default=4, help="mock parallel slots")
+    parser.add_argument("--hosts", type=int, default=1, help="mock servers in the endpoint pool")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="requests in flight per host")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON file for the results (default: benchmarks/results/)")
+    parser.add_argument("--compare", help="previous JSON result to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline output")
+    args = parser.parse_args()
+
+    servers = [start_mock_server(config=MockConfig(latency=args.latency, num_parallel=args.num_parallel, seed=args.seed))
+               for _ in range(args.hosts)]
+    work_dir = tempfile.mkdtemp(prefix="throughput_")
+    # Read by the flow processes when they import codification
+    os.environ["OLLAMA_API_URLS"] = ",".join(f"{server.url}/api/generate" for server in servers)
+    os.environ["LLM_CACHE_BYPASS"] = "1"
+    os.environ["LLM_CACHE_PATH"] = os.path.join(work_dir, "llm_cache.sqlite")
+
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "config": vars(args),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "flows": {},
+    }
+
+    started = time.perf_counter()
+    source = os.path.join(work_dir, "synthetic.xlsx")
+    make_workbook(source, args.rows, args.constructs, args.html_chars, args.seed)
+    print(f"📄 Synthetic workbook: {args.rows} rows x {args.constructs} constructs "
+          f"({os.path.getsize(source) / 1e6:.1f} MB, {time.perf_counter() - started:.1f}s)")
+
+    context = multiprocessing.get_context("spawn")
+    for flow in args.flows:
+        # Each flow codes its own copy, in its own directory (cold clean-text cache)
+        flow_dir = os.path.join(work_dir, flow)
+        os.makedirs(flow_dir)
+        excel_path = os.path.join(flow_dir, "synthetic.xlsx")
+        with open(source, "rb") as src, open(excel_path, "wb") as dst:
+            dst.write(src.read())
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_flow, flow, excel_path, args.rows, args.constructs,
+                                 args.max_in_flight * args.hosts, args.verbose).result()
+        results["flows"][flow] = result
+        stages = ", ".join(f"{stage} {values['seconds']:.2f}s" for stage, values in result["stages"].items())
+        print(f"⏱️ {flow}: {result['cells_per_second']} cells/s, {result['wall_seconds']}s wall "
+              f"({stages}), peak {result['peak_memory_mb']} MB")
+
+    for server in servers:
+        server.shutdown()
+    results["mock"] = [server.backend.stats for server in servers]
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"throughput_{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results saved to '{output}'")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Shared helpers for the LLM codification scripts.
+
+The scripts in Full/, Newfull/, Baker*/ and Demhaic*/ keep their own prompt
+templates and file paths; everything that talks to the model or writes the
+workbook lives here so it only has to be fixed once.
+"""
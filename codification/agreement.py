@@ -0,0 +1,215 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+# Bootstrap settings for the confidence intervals of kappa and AC1
+BOOTSTRAP_RESAMPLES = 2000
+BOOTSTRAP_CONFIDENCE = 0.95
+BOOTSTRAP_SEED = 42
+
+
+def label_matrix(sheet, rows, columns):
+    """
+    Return the labels of 'sheet' (a DataFrame read with header=None) in the given
+    rows and columns as a float array, with non-numeric cells as NaN.
+    """
+    block = sheet.iloc[rows, columns]
+    return block.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+
+
+def category_counts(labels, valid, categories):
+    """
+    Number of valid rows with each category, per column: shape (categories, columns).
+    """
+    return np.stack([((labels == category) & valid).sum(axis=0) for category in categories])
+
+
+def agreement_table(human, model, categories=None):
+    """
+    Agreement between two (rows x constructs) label arrays, all constructs at once.
+
+    Missing human labels count as 0 (not coded). Rows without a model label are
+    counted as disagreements, but are left out of kappa and AC1, as in the
+    original per-cell loop. Returns a dict of per-construct arrays:
+    n (rows used for kappa/AC1), agree, disagree, percent (agreement over the
+    rows with a model label), kappa (Cohen's), ac1 (Gwet's) and the per-cell
+    matches (rows x constructs, for coloring the sheet). Kappa and AC1 are
+    NaN when they are undefined (no rows, or a single label for both raters).
+    'categories' defaults to the labels found in both arrays.
+    """
+    human = np.where(np.isnan(human), 0.0, human)
+    valid = ~np.isnan(model)
+    matches = human == model
+
+    agree = matches.sum(axis=0)
+    disagree = matches.shape[0] - agree
+    n = valid.sum(axis=0)
+
+    if categories is None:
+        categories = np.unique(np.concatenate([human[valid], model[valid]]))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        observed = (matches & valid).sum(axis=0) / n
+        p_human = category_counts(human, valid, categories) / n
+        p_model = category_counts(model, valid, categories) / n
+
+        # Cohen: chance agreement from the product of the two raters' marginals
+        expected_cohen = (p_human * p_model).sum(axis=0)
+        kappa = (observed - expected_cohen) / (1 - expected_cohen)
+
+        # Gwet: chance agreement from the average marginal of each category
+        pi = (p_human + p_model) / 2
+        expected_gwet = (pi * (1 - pi)).sum(axis=0) / max(len(categories) - 1, 1)
+        ac1 = (observed - expected_gwet) / (1 - expected_gwet)
+
+    undefined = (n == 0) | np.isclose(expected_cohen, 1.0)
+    kappa = np.where(undefined, np.nan, kappa)
+    ac1 = np.where((n == 0) | np.isclose(expected_gwet, 1.0), np.nan, ac1)
+
+    return {
+        "n": n,
+        "agree": agree,
+        "disagree": disagree,
+        "percent": observed,
+        "kappa": kappa,
+        "ac1": ac1,
+        "matches": matches,
+    }
+
+
+def resample_indices(rows, resamples=BOOTSTRAP_RESAMPLES, seed=BOOTSTRAP_SEED):
+    """
+    (rows x resamples) matrix of row indices drawn with replacement.
+    """
+    return np.random.default_rng(seed).integers(0, rows, size=(rows, resamples))
+
+
+def bootstrap_construct(human, model, resamples=BOOTSTRAP_RESAMPLES, confidence=BOOTSTRAP_CONFIDENCE,
+                        seed=BOOTSTRAP_SEED):
+    """
+    Percentile intervals of kappa and AC1 for one construct (1-D label arrays).
+    The resamples become the columns of one agreement_table() call, so all of
+    them are computed at once. Returns ((kappa_low, kappa_high), (ac1_low, ac1_high)).
+    """
+    human = np.where(np.isnan(human), 0.0, human)
+    valid = ~np.isnan(model)
+    categories = np.unique(np.concatenate([human[valid], model[valid]]))
+    indices = resample_indices(len(human), resamples, seed)
+    results = agreement_table(human[indices], model[indices], categories)
+    tail = 100 * (1 - confidence) / 2
+    intervals = []
+    for statistic in ("kappa", "ac1"):
+        values = results[statistic]
+        if np.isnan(values).all():
+            intervals.append((np.nan, np.nan))
+        else:
+            intervals.append(tuple(np.nanpercentile(values, [tail, 100 - tail])))
+    return tuple(intervals)
+
+
+def bootstrap_intervals(human, model, resamples=BOOTSTRAP_RESAMPLES, confidence=BOOTSTRAP_CONFIDENCE,
+                        seed=BOOTSTRAP_SEED, workers=None):
+    """
+    Bootstrap confidence intervals of kappa and AC1 for every construct of two
+    (rows x constructs) label arrays, with the conventions of agreement_table().
+    Every construct uses the same resampled rows. With 'workers' > 1 the
+    constructs are spread over a process pool. Returns a dict of
+    (constructs x 2) arrays: kappa and ac1 (low, high).
+    """
+    columns = range(human.shape[1])
+    arguments = ([human[:, c] for c in columns], [model[:, c] for c in columns],
+                 [resamples] * len(columns), [confidence] * len(columns), [seed] * len(columns))
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            intervals = list(pool.map(bootstrap_construct, *arguments))
+    else:
+        intervals = list(map(bootstrap_construct, *arguments))
+    return {
+        "kappa": np.array([kappa for kappa, _ in intervals]),
+        "ac1": np.array([ac1 for _, ac1 in intervals]),
+    }
+
+
+def one_hot(labels, categories):
+    """
+    (categories x ...) indicator array of 'labels'; NaN rows are all zero.
+    """
+    return np.stack([labels == category for category in categories]).astype(float)
+
+
+def pairwise_agreement(labels):
+    """
+    Cohen's kappa and Gwet's AC1 between every pair of raters, per construct.
+
+    'labels' is (raters x rows x constructs) with NaN for missing labels; each
+    pair is compared on the rows both raters labelled. Returns (kappa, ac1,
+    percent, n), each (raters x raters x constructs), in one vectorized sweep.
+    """
+    valid = (~np.isnan(labels)).astype(float)
+    categories = np.unique(labels[~np.isnan(labels)])
+    indicators = one_hot(labels, categories)
+
+    # Rows labelled by both raters, matching labels, and marginals on those rows
+    n = np.einsum("anc,bnc->abc", valid, valid)
+    matches = np.einsum("kanc,kbnc->abc", indicators, indicators)
+    counts_a = np.einsum("kanc,bnc->kabc", indicators, valid)
+    counts_b = np.einsum("anc,kbnc->kabc", valid, indicators)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        observed = matches / n
+        p_a = counts_a / n
+        p_b = counts_b / n
+        expected_cohen = (p_a * p_b).sum(axis=0)
+        kappa = (observed - expected_cohen) / (1 - expected_cohen)
+        pi = (p_a + p_b) / 2
+        expected_gwet = (pi * (1 - pi)).sum(axis=0) / max(len(categories) - 1, 1)
+        ac1 = (observed - expected_gwet) / (1 - expected_gwet)
+
+    kappa = np.where((n == 0) | np.isclose(expected_cohen, 1.0), np.nan, kappa)
+    ac1 = np.where((n == 0) | np.isclose(expected_gwet, 1.0), np.nan, ac1)
+    return kappa, ac1, observed, n
+
+
+def fleiss_kappa(labels):
+    """
+    Fleiss' kappa of replicate runs, per construct.
+
+    'labels' is (replicates x rows x constructs); only rows labelled by every
+    replicate are used. Returns (kappa, n) arrays over constructs.
+    """
+    raters = labels.shape[0]
+    complete = (~np.isnan(labels)).all(axis=0)
+    categories = np.unique(labels[~np.isnan(labels)])
+
+    # Raters choosing each category, per row and construct
+    counts = one_hot(labels, categories).sum(axis=1) * complete
+    n = complete.sum(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        row_agreement = ((counts ** 2).sum(axis=0) - raters) / (raters * (raters - 1))
+        observed = (row_agreement * complete).sum(axis=0) / n
+        proportions = counts.sum(axis=1) / (n * raters)
+        expected = (proportions ** 2).sum(axis=0)
+        kappa = (observed - expected) / (1 - expected)
+
+    kappa = np.where((n == 0) | np.isclose(expected, 1.0), np.nan, kappa)
+    return kappa, n
+
+
+def interpret_kappa(kappa):
+    """
+    Landis & Koch interpretation of a kappa value.
+    """
+    if pd.isna(kappa):
+        return "Not enough data or insufficient unique labels"
+    elif kappa < 0:
+        return "Less than chance agreement"
+    elif kappa <= 0.20:
+        return "Slight agreement"
+    elif kappa <= 0.40:
+        return "Fair agreement"
+    elif kappa <= 0.60:
+        return "Moderate agreement"
+    elif kappa <= 0.80:
+        return "Substantial agreement"
+    else:
+        return "Almost perfect agreement"
@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from codification.client import dumps, loads, post_json
+
+# Local response cache shared by every script of the repository
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED_CACHE_PATH = os.path.join(REPO_DIR, "llm_cache.sqlite")
+CACHE_PATH = os.environ.get("LLM_CACHE_PATH", SHARED_CACHE_PATH)
+MAX_CACHE_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "500000"))
+
+# The table size is checked against MAX_CACHE_ENTRIES once every this many inserts
+EVICT_CHECK_EVERY = 1000
+
+# Set LLM_CACHE_BYPASS=1 for intentional replicates of the shared pipeline:
+# every prompt is sent to the model again and the stored answer is replaced.
+# The replicate scripts of Baker*/, Demhaic*/, others/, Cleaning_Prompt/ and
+# ChatGPT/ always bypass the cache (see replicate_backend()).
+BYPASS = os.environ.get("LLM_CACHE_BYPASS", "0") == "1"
+
+# Payload fields that do not change the answer
+IGNORED_FIELDS = ("stream", "keep_alive")
+
+
+def prompt_hash(payload):
+    """
+    SHA-256 of the prompt text ('prompt' for Ollama, 'messages' for OpenAI).
+    """
+    if "messages" in payload:
+        prompt = json.dumps(payload["messages"], sort_keys=True, ensure_ascii=False)
+    else:
+        prompt = str(payload.get("prompt", ""))
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def cache_key(backend, payload):
+    """
+    Key of a request: backend, model, decoding options and the prompt hash.
+    """
+    options = {
+        field: value for field, value in payload.items()
+        if field not in ("model", "prompt", "messages") + IGNORED_FIELDS
+    }
+    key_fields = {
+        "backend": backend,
+        "model": payload.get("model"),
+        "options": options,
+        "prompt": prompt_hash(payload),
+    }
+    return hashlib.sha256(json.dumps(key_fields, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def replicate_backend(backend, excel_path):
+    """
+    Backend name of an intentional replicate run ('ollama' and .../Baker2/Zero3.xlsx
+    -> 'ollama:Baker2/Zero3'), so the answers it stores are kept apart from
+    those of every other workbook.
+    """
+    folder = os.path.basename(os.path.dirname(os.path.abspath(excel_path)))
+    return f"{backend}:{folder}/{os.path.splitext(os.path.basename(excel_path))[0]}"
+
+
+class ResponseCache:
+    """
+    Content-addressed store of raw LLM responses in a SQLite file.
+
+    Each entry keeps the full response JSON and the time the request took.
+    Every EVICT_CHECK_EVERY inserts the table size is checked, and when it
+    has grown past 'max_entries' the least recently used entries are evicted
+    down to 90% of it. Answers of the mock server (codification/mockserver.py)
+    are not stored in the shared cache of the repository. Safe to use from the
+    engine's worker threads.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_CACHE_ENTRIES, name="Response cache"):
+        self.path = path
+        self.name = name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.saved_seconds = 0.0
+        self.inserts = 0
+        self.lock = threading.Lock()
+        self.connection = None
+
+    def connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, backend TEXT, model TEXT, prompt_sha TEXT,"
+                " response TEXT, elapsed REAL, created REAL, last_used REAL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        return self.connection
+
+    def get(self, backend, payload, validate=None):
+        """
+        Return (response_json, elapsed) for a cached request, or None. An entry
+        for which 'validate(response_json)' is false is deleted and counts as a miss.
+        """
+        key = cache_key(backend, payload)
+        with self.lock:
+            connection = self.connect()
+            row = connection.execute("SELECT response, elapsed FROM responses WHERE key = ?", (key,)).fetchone()
+            response_json = None if row is None else loads(row[0])
+            if row is not None and validate is not None and not validate(response_json):
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                connection.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += row[1] or 0.0
+            connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            connection.commit()
+        return response_json, row[1]
+
+    def put(self, backend, payload, response_json, elapsed):
+        """
+        Store the raw response of a successful request.
+        """
+        if self.path == SHARED_CACHE_PATH and isinstance(response_json, dict) and response_json.get("mock"):
+            return
+        now = time.time()
+        with self.lock:
+            connection = self.connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(backend, payload), backend, payload.get("model"), prompt_hash(payload),
+                 dumps(response_json).decode("utf-8"), elapsed, now, now),
+            )
+            # On the first insert and then every EVICT_CHECK_EVERY: other scripts
+            # write to the same file, so the size is read from the table
+            if self.inserts % EVICT_CHECK_EVERY == 0:
+                self.evict_locked(connection)
+            self.inserts += 1
+            connection.commit()
+
+    def evict_locked(self, connection):
+        count = connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            evict = count - self.max_entries + self.max_entries // 10
+            connection.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used LIMIT ?)", (evict,)
+            )
+
+    def report(self):
+        """
+        Print the hit/miss counters of this run and the request time the hits saved.
+        """
+        total = self.hits + self.misses
+        if total == 0 and self.bypassed == 0:
+            return
+        hit_rate = 100 * self.hits / total if total else 0.0
+        print(f"🗄️ {self.name}: {self.hits} hits, {self.misses} misses, {self.bypassed} bypassed "
+              f"({hit_rate:.1f}% hit rate, ~{self.saved_seconds:.1f}s of requests saved, {self.path})")
+
+
+RESPONSE_CACHE = ResponseCache()
+
+
+def cache_lookup(payload, backend="ollama", bypass=BYPASS, cache=RESPONSE_CACHE, validate=None):
+    """
+    Cached response JSON of 'payload', or None. With 'bypass' the cache is not
+    read (the request is counted as bypassed). 'validate' is passed on to
+    ResponseCache.get().
+    """
+    if bypass:
+        with cache.lock:
+            cache.bypassed += 1
+        return None
+    cached = cache.get(backend, payload, validate)
+    return None if cached is None else cached[0]
+
+
+def post_and_cache(url, payload, headers=None, backend="ollama", cache=RESPONSE_CACHE, timeout=None, validate=None):
+    """
+    POST 'payload' to 'url' and store the decoded JSON response in the cache,
+    unless 'validate(response_json)' is false (e.g. an answer that is not a
+    label, which must be asked again rather than replayed). 'timeout' is passed
+    on to post_json() (seconds, or a (connect, read) tuple).
+    """
+    started = time.perf_counter()
+    if timeout is None:
+        response_json = post_json(url, payload, headers=headers)
+    else:
+        response_json = post_json(url, payload, headers=headers, timeout=timeout)
+    if validate is None or validate(response_json):
+        cache.put(backend, payload, response_json, time.perf_counter() - started)
+    return response_json
+
+
+def cached_request(url, payload, headers=None, backend="ollama", bypass=BYPASS, cache=RESPONSE_CACHE, timeout=None,
+                   validate=None):
+    """
+    Like cached_post(), but returns (response_json, from_cache). 'timeout' is
+    passed on to post_json() (seconds, or a (connect, read) tuple).
+    """
+    response_json = cache_lookup(payload, backend, bypass, cache, validate)
+    if response_json is not None:
+        return response_json, True
+    return post_and_cache(url, payload, headers, backend, cache, timeout, validate), False
+
+
+def cached_post(url, payload, headers=None, backend="ollama", bypass=BYPASS, cache=RESPONSE_CACHE, validate=None):
+    """
+    POST 'payload' to 'url' and return the decoded JSON response, answering from
+    the response cache when the same request was already made. Responses for
+    which 'validate(response_json)' is false are not cached (see post_and_cache()).
+    Raises the same exceptions as client.post_json() on failure.
+    """
+    return cached_request(url, payload, headers, backend, bypass, cache, validate=validate)[0]
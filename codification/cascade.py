@@ -0,0 +1,206 @@
+"""
+Small-model cascade: a cheap local model codes every cell first and only the
+cells it is unsure about go to the large model.
+
+The confidence of the cheap answer is max(P("1"), P("0")) from its logprobs.
+On servers without logprobs a second, sampled answer of the cheap model is
+compared with the greedy one: agreement counts as confident, disagreement
+as 0.5. Cells below the threshold (and cheap 'Error' answers) are escalated.
+
+Picking a threshold: code a workbook with the small model and SCORE = True
+(labels + P("1") in the "Probability" sheet), then compare it with a
+large-model run of the same rows:
+
+    python -m codification.cascade small.xlsx baseline.xlsx [--thresholds 0.8 0.9 0.95]
+"""
+import os
+import sys
+import zlib
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+
+from codification.agreement import agreement_table, label_matrix
+from codification.cache import BYPASS
+from codification.ollama import score_with_ollama, send_to_ollama
+from codification.scoring import PROBABILITY_SHEET
+
+# Cheap model that codes every cell first
+CASCADE_MODEL = os.environ.get("CODING_CASCADE_MODEL", "llama3.1:8b")
+
+# Cells whose cheap answer has a lower confidence go to the large model
+CASCADE_THRESHOLD = float(os.environ.get("CODING_CASCADE_THRESHOLD", "0.9"))
+
+# Sampling of the second cheap answer when the server has no logprobs
+AGREEMENT_OPTIONS = {"temperature": 0.8, "seed": 7}
+
+# Fraction of the confident cells also sent to the large model, to measure
+# the agreement of the cascade with the large model during the run
+CASCADE_VERIFY = float(os.environ.get("CODING_CASCADE_VERIFY", "0"))
+
+# Thresholds compared by default in the evaluation
+THRESHOLDS = (0.6, 0.7, 0.8, 0.9, 0.95, 0.99)
+
+# Columns that contain codes in the "Codification" sheet (G..S)
+CODE_COLUMNS = list(range(6, 19))
+
+
+def with_model(data_payload, model, options=None):
+    """
+    Copy of a coding payload for 'model', with extra decoding 'options'.
+    """
+    return {**data_payload, "model": model, "options": {**data_payload.get("options", {}), **(options or {})}}
+
+
+def cheap_label(data_payload, row_idx, code_name, model=CASCADE_MODEL, attempt=None, bypass=BYPASS):
+    """
+    Code one cell with the cheap model and return (label, confidence).
+    """
+    label, probability = score_with_ollama(with_model(data_payload, model), row_idx, code_name, attempt, bypass)
+    if label == "Error":
+        return label, 0.0
+    if probability is not None:
+        return label, max(probability, 1 - probability)
+    second = send_to_ollama(with_model(data_payload, model, AGREEMENT_OPTIONS), row_idx, code_name, attempt, bypass)
+    return label, 1.0 if second == label else 0.5
+
+
+def verify_sample(row_idx, code_name, fraction=CASCADE_VERIFY):
+    """
+    Deterministic 'fraction' of the cells, the same ones on every run.
+    """
+    return zlib.crc32(f"{row_idx}|{code_name}".encode("utf-8")) / 2 ** 32 < fraction
+
+
+class CascadeStats:
+    """
+    Per-construct count of the cells coded by the cascade, the escalated ones,
+    and the verified confident cells that agree with the large model.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def observe(self, code_name, escalated, verified=None):
+        with self.lock:
+            counts = self.counts.setdefault(code_name, {"cells": 0, "escalated": 0, "verified": 0, "agree": 0})
+            counts["cells"] += 1
+            counts["escalated"] += int(escalated)
+            if verified is not None:
+                counts["verified"] += 1
+                counts["agree"] += int(verified)
+
+    def report(self):
+        if not self.counts:
+            return None
+        print(f"\n🪜 Cascade: {'construct':<24}{'cells':>7}{'cheap':>7}{'escalated':>11}{'rate':>8}"
+              f"{'verified':>10}{'agree':>8}")
+        for code_name, counts in self.counts.items():
+            cheap = counts["cells"] - counts["escalated"]
+            rate = 100 * counts["escalated"] / counts["cells"]
+            agree = f"{100 * counts['agree'] / counts['verified']:.1f}%" if counts["verified"] else "-"
+            print(f"            {code_name[:23]:<24}{counts['cells']:>7}{cheap:>7}{counts['escalated']:>11}"
+                  f"{rate:>7.1f}%{counts['verified']:>10}{agree:>8}")
+        cells = sum(counts["cells"] for counts in self.counts.values())
+        escalated = sum(counts["escalated"] for counts in self.counts.values())
+        print(f"🪜 {cells - escalated}/{cells} cells kept the cheap label, {escalated} escalated to the large model "
+              f"({100 * escalated / cells:.1f}%)")
+        return self.counts
+
+
+CASCADE = CascadeStats()
+
+
+def cascade_send(data_payload, row_idx, code_name, model=CASCADE_MODEL, threshold=CASCADE_THRESHOLD, attempt=None,
+                 bypass=BYPASS):
+    """
+    Like send_to_ollama() for the large model in 'data_payload', but asks the
+    cheap 'model' first and only escalates when its confidence is below 'threshold'.
+    """
+    label, confidence = cheap_label(data_payload, row_idx, code_name, model, attempt, bypass)
+    if label == "Error" or confidence < threshold:
+        label = send_to_ollama(data_payload, row_idx, code_name, attempt, bypass)
+        CASCADE.observe(code_name, escalated=True)
+    elif verify_sample(row_idx, code_name):
+        CASCADE.observe(code_name, escalated=False,
+                        verified=send_to_ollama(data_payload, row_idx, code_name, attempt, bypass) == label)
+    else:
+        CASCADE.observe(code_name, escalated=False)
+    return label
+
+
+def read_run(excel_path, code_columns=CODE_COLUMNS):
+    """
+    Construct names, labels and P("1") (from the Probability sheet, if any) of a
+    coded workbook, plus the mask of the cells that were coded at all ('Error'
+    included, blank excluded).
+    """
+    codif_sheet = pd.read_excel(excel_path, sheet_name="Codification", header=None)
+    code_columns = [col for col in code_columns if col < codif_sheet.shape[1]]
+    rows = list(range(1, len(codif_sheet)))
+    names = [str(codif_sheet.iloc[0, col]).strip() for col in code_columns]
+    labels = label_matrix(codif_sheet, rows, code_columns)
+    coded = codif_sheet.iloc[rows, code_columns].notna().to_numpy()
+    try:
+        probability = pd.read_excel(excel_path, sheet_name=PROBABILITY_SHEET, header=None)
+        probabilities = label_matrix(probability.reindex(index=range(len(codif_sheet))), rows, code_columns)
+    except ValueError:
+        probabilities = np.full(labels.shape, np.nan)
+    return names, labels, probabilities, coded
+
+
+def evaluate(small, probabilities, baseline, coded=None, thresholds=THRESHOLDS):
+    """
+    Escalation rate and agreement with 'baseline' of the cascade at each
+    threshold, from a scored small-model run: a cell keeps its small label
+    when max(P("1"), P("0")) reaches the threshold and takes the baseline
+    label otherwise. Cells without a probability are always escalated. Only
+    the cells 'coded' by the small run with a baseline label are compared.
+    Returns a list of dicts, one per threshold.
+    """
+    valid = ~np.isnan(baseline)
+    if coded is not None:
+        valid &= coded
+    confidence = np.maximum(probabilities, 1 - probabilities)
+    results = []
+    for threshold in thresholds:
+        confident = ~np.isnan(small) & (confidence >= threshold)
+        cascade = np.where(confident, small, baseline)
+        table = agreement_table(np.where(valid, baseline, np.nan), np.where(valid, cascade, np.nan),
+                                categories=np.array([0.0, 1.0]))
+        results.append({
+            "threshold": threshold,
+            "escalated": float((~confident & valid).sum() / valid.sum()),
+            "percent": float(np.nanmean(table["percent"])),
+            "kappa": float(np.nanmean(table["kappa"])),
+            "per_construct": table["percent"],
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Escalation rate and agreement of the cascade per threshold")
+    parser.add_argument("small", help="workbook coded by the small model with SCORE = True")
+    parser.add_argument("baseline", help="workbook coded by the large model only")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=list(THRESHOLDS))
+    args = parser.parse_args(argv)
+
+    names, small, probabilities, coded = read_run(args.small)
+    baseline = read_run(args.baseline)[1]
+    rows = min(len(small), len(baseline))
+    small, probabilities, coded, baseline = small[:rows], probabilities[:rows], coded[:rows], baseline[:rows]
+    if np.isnan(probabilities).all():
+        print(f"⚠️ No '{PROBABILITY_SHEET}' values in {args.small}: every cell would be escalated")
+
+    print(f"🪜 {int((coded & ~np.isnan(baseline)).sum())} cells of {rows} rows x {len(names)} constructs, "
+          f"small model vs baseline")
+    print(f"{'threshold':>10}{'escalated':>11}{'agreement':>11}{'kappa':>8}")
+    for result in evaluate(small, probabilities, baseline, coded, args.thresholds):
+        print(f"{result['threshold']:>10}{100 * result['escalated']:>10.1f}%{100 * result['percent']:>10.1f}%"
+              f"{result['kappa']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,67 @@
+import json
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson  # Optional: much faster JSON encoding/decoding
+except ImportError:
+    orjson = None
+
+# Timeouts in seconds. Connecting to a live server takes milliseconds; reading
+# has to cover a full 70B generation queued behind OLLAMA_NUM_PARALLEL others.
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 900
+
+# Keep-alive connections kept open per host (at least the engine's in-flight limit)
+POOL_SIZE = 64
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def dumps(payload):
+    """
+    Encode 'payload' as UTF-8 JSON bytes.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def loads(data):
+    """
+    Decode JSON bytes. Both decoders raise a json.JSONDecodeError subclass.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def get_session():
+    """
+    Return the shared requests.Session, whose connection pool keeps TCP
+    connections to the Ollama / OpenAI servers alive between requests.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+    return _session
+
+
+def post_json(url, payload, headers=None, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+    """
+    POST 'payload' as JSON over the pooled session and return the decoded response.
+    Raises requests exceptions (including HTTPError for 4xx/5xx and Timeout)
+    and json.JSONDecodeError, like the requests.post() calls it replaces.
+    """
+    request_headers = {'Content-Type': 'application/json'}
+    request_headers.update(headers or {})
+    response = get_session().post(url, data=dumps(payload), headers=request_headers, timeout=timeout)
+    response.raise_for_status()
+    return loads(response.content)
@@ -0,0 +1,211 @@
+"""
+Near-duplicate activities: code one representative and copy its labels.
+
+Lessons reuse a lot of activity text and embedded-media boilerplate. Each row
+is reduced to the word shingles of its cleaned activity_description and
+embed_description; MinHash signatures with LSH banding find the candidate
+pairs and the exact Jaccard similarity of the shingles decides. Rows are
+grouped around a representative (the first row of the group), so every
+member is at least 'threshold' similar to the row whose labels it receives.
+
+Inspect the groups of a workbook before using them in run_coding(dedup=...):
+
+    python -m codification.dedup Zero.xlsx [--threshold 0.9] [--show 5]
+"""
+import re
+import sys
+import zlib
+import argparse
+import numpy as np
+import pandas as pd
+
+# Default Jaccard similarity above which two activities count as duplicates
+DEDUP_THRESHOLD = 0.9
+
+# Words per shingle
+SHINGLE_SIZE = 3
+
+# MinHash permutations (signature length)
+NUM_PERM = 128
+
+# Hashes are taken modulo this Mersenne prime, so a*x + b fits in 64 bits
+PRIME = (1 << 31) - 1
+
+# Fields compared (already cleaned by read_row)
+DEDUP_FIELDS = ("activity_description", "embed_description")
+
+# Shorter texts (in words) are never grouped: too little to compare
+MIN_WORDS = 5
+
+# Fill-ins of the export for a missing field, not activity text
+PLACEHOLDERS = ("No task description", "No artifact embedded")
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Set of hashed word 'size'-grams of 'text' (lowercased, punctuation removed).
+    """
+    words = re.findall(r"\w+", str(text).lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode("utf-8")) % PRIME} if words else set()
+    return {zlib.crc32(" ".join(words[k:k + size]).encode("utf-8")) % PRIME for k in range(len(words) - size + 1)}
+
+
+def row_text(row, fields=DEDUP_FIELDS):
+    """
+    Text of 'row' compared between activities, without the export placeholders.
+    """
+    values = (row[field] for field in fields)
+    return " ".join(str(value) for value in values
+                    if value and not pd.isna(value) and str(value).strip() not in PLACEHOLDERS)
+
+
+def minhash_signatures(shingle_sets, num_perm=NUM_PERM, seed=42):
+    """
+    MinHash signature of every shingle set: shape (sets, num_perm).
+    Empty sets all get the same all-PRIME signature, so they would share every
+    LSH bucket: leave them out (duplicate_groups() does).
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, PRIME, size=num_perm, dtype=np.uint64)
+    signatures = np.full((len(shingle_sets), num_perm), PRIME, dtype=np.uint64)
+    for k, hashes in enumerate(shingle_sets):
+        if hashes:
+            x = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+            signatures[k] = ((a[:, None] * x[None, :] + b[:, None]) % PRIME).min(axis=1)
+    return signatures
+
+
+def lsh_bands(threshold, num_perm=NUM_PERM):
+    """
+    (bands, rows per band) whose LSH threshold (1/bands)^(1/rows) is the
+    highest one still below 'threshold', so few true pairs are missed.
+    """
+    options = [(num_perm // r, r) for r in range(1, num_perm + 1) if num_perm % r == 0]
+    below = [(b, r) for b, r in options if (1 / b) ** (1 / r) <= threshold * 0.9]
+    return max(below, key=lambda band: (1 / band[0]) ** (1 / band[1])) if below else options[-1]
+
+
+def candidate_pairs(signatures, threshold, num_perm=NUM_PERM):
+    """
+    Pairs (i, j), i < j, of signature indices that share at least one LSH band.
+    """
+    bands, rows = lsh_bands(threshold, num_perm)
+    pairs = set()
+    for band in range(bands):
+        buckets = {}
+        for k, key in enumerate(map(bytes, signatures[:, band * rows:(band + 1) * rows])):
+            buckets.setdefault(key, []).append(k)
+        for members in buckets.values():
+            if len(members) > 1:
+                pairs.update((i, j) for n, i in enumerate(members) for j in members[n + 1:])
+    return pairs
+
+
+def jaccard(first, second):
+    return len(first & second) / len(first | second) if first and second else 0.0
+
+
+def duplicate_groups(texts, threshold=DEDUP_THRESHOLD):
+    """
+    Group near-duplicate 'texts' (a {row: text} dict). Returns {representative:
+    [members]} for the groups with at least one member; rows are visited in
+    order and each unassigned row takes its unassigned neighbours with a
+    Jaccard similarity of at least 'threshold'.
+    """
+    rows = list(texts)
+    shingle_sets = [shingles(texts[i]) if len(str(texts[i]).split()) >= MIN_WORDS else set() for i in rows]
+    # Short and empty rows are never grouped: keep them out of the LSH buckets,
+    # where their identical signatures would pair each of them with all the others
+    indexed = [k for k, hashes in enumerate(shingle_sets) if hashes]
+    signatures = minhash_signatures([shingle_sets[k] for k in indexed])
+
+    neighbours = {}
+    for a, b in candidate_pairs(signatures, threshold):
+        i, j = indexed[a], indexed[b]
+        if jaccard(shingle_sets[i], shingle_sets[j]) >= threshold:
+            neighbours.setdefault(i, []).append(j)
+            neighbours.setdefault(j, []).append(i)
+
+    groups = {}
+    assigned = set()
+    for k in range(len(rows)):
+        if k in assigned or k not in neighbours:
+            continue
+        members = sorted(n for n in neighbours[k] if n not in assigned and n > k)
+        if members:
+            assigned.update(members)
+            assigned.add(k)
+            groups[rows[k]] = [rows[n] for n in members]
+    return groups
+
+
+def verify_members(groups, fraction):
+    """
+    Members (a deterministic 'fraction' of them) coded on their own as well,
+    to check the copied labels.
+    """
+    return {member for members in groups.values() for member in members
+            if zlib.crc32(str(member).encode("utf-8")) / 2 ** 32 < fraction}
+
+
+def describe(groups, rows):
+    """
+    One line with the number of groups and the share of rows (hence of LLM calls) avoided.
+    """
+    copied = sum(len(members) for members in groups.values())
+    return (f"{len(groups)} groups of near-duplicates, {copied}/{len(rows)} rows take the labels of their "
+            f"representative ({100 * copied / len(rows) if rows else 0:.1f}% of the LLM calls avoided)")
+
+
+def report_copies(copies, representative, verified, labels, cells):
+    """
+    Print the share of the 'cells' of a run that were copied instead of sent,
+    and how often the verified rows agree with their representative.
+    'labels' maps (row, code_col) to the label written by the run.
+    """
+    members = {member for group in copies.values() for member in group}
+    copied = sum(1 for row, _ in labels if row in members)
+    print(f"🧬 {copied}/{cells} cells copied from their representative "
+          f"({100 * copied / cells if cells else 0:.1f}% of the LLM calls avoided)")
+
+    compared = agree = 0
+    for (row, code_col), label in labels.items():
+        if row not in verified:
+            continue
+        rep_label = labels.get((representative[row], code_col))
+        if label in ("0", "1") and rep_label in ("0", "1"):
+            compared += 1
+            agree += int(label == rep_label)
+    if compared:
+        print(f"🧬 Verified rows agree with their representative on {agree}/{compared} cells "
+              f"({100 * agree / compared:.1f}%)")
+
+
+def main(argv=None):
+    from codification.pipeline import read_row
+    from codification.textcache import CleanTextCache
+
+    parser = argparse.ArgumentParser(description="Near-duplicate activities of a Codification sheet")
+    parser.add_argument("workbook")
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD)
+    parser.add_argument("--show", type=int, default=3, help="groups to print")
+    args = parser.parse_args(argv)
+
+    codif_sheet = pd.read_excel(args.workbook, sheet_name="Codification", header=None)
+    text_cache = CleanTextCache(args.workbook)
+    rows = range(1, len(codif_sheet))
+    texts = {i: row_text(read_row(codif_sheet, i, text_cache)) for i in rows}
+    text_cache.save()
+
+    groups = duplicate_groups(texts, args.threshold)
+    print(f"🧬 {describe(groups, rows)} at similarity {args.threshold}")
+    largest = sorted(groups.items(), key=lambda group: -len(group[1]))[:args.show]
+    for representative, members in largest:
+        print(f"   row {representative + 1} → rows {', '.join(str(member + 1) for member in members)}: "
+              f"{texts[representative][:100]!r}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
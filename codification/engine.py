@@ -0,0 +1,77 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
+
+from codification.pool import API_URLS
+from codification.retry import RetryLater
+
+# Number of requests kept in flight against each server. Ollama only serves
+# OLLAMA_NUM_PARALLEL requests per model at once and queues the rest, so going
+# higher than that just moves the queue from our side to the server.
+NUM_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))
+MAX_IN_FLIGHT = NUM_PARALLEL * len(API_URLS)
+
+# One (row, construct) cell to code. 'row' and 'code_col' are 0-based pandas
+# indices, the same ones the scripts use with codif_sheet.iloc[row, code_col].
+# 'attempt' counts the retries of the job (see RetryLater).
+CodingJob = namedtuple("CodingJob", ["row", "code_col", "code_name", "payload", "attempt"], defaults=(0,))
+
+
+async def run_jobs_async(jobs, send, on_result, max_in_flight=MAX_IN_FLIGHT, gate=None, defer_after=None):
+    """
+    Run send(job) for every job with at most 'max_in_flight' calls running at once.
+    'send' is a blocking function (e.g. send_to_ollama) and is run in a worker thread.
+    on_result(job, value) is called from the event loop as soon as each job finishes,
+    so results arrive out of order but are always handed back with their own job.
+    If send() raises RetryLater, the job gives up its slot, waits the delay and is
+    sent again with its 'attempt' increased. With a 'gate' (e.g. the circuit
+    breaker of retry.py), no call starts while gate.pause() asks to wait.
+    With 'defer_after', a job still failing after that many attempts is set
+    aside instead of retried again: it gets no on_result() call and is returned
+    in the list of deferred jobs, to be sent again once the other jobs are done.
+    """
+    max_in_flight = max(1, max_in_flight)
+    semaphore = asyncio.Semaphore(max_in_flight)
+    # The default executor is capped at a few dozen threads; size it to the limit
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_in_flight))
+
+    async def run_one(job):
+        while True:
+            async with semaphore:
+                while gate is not None and (pause := gate.pause()) > 0:
+                    await asyncio.sleep(pause)
+                try:
+                    value = await asyncio.to_thread(send, job)
+                    return job, value
+                except RetryLater as retry:
+                    delay = retry.delay
+            if defer_after is not None and job.attempt + 1 >= defer_after:
+                deferred.append(job)
+                return None
+            # Back off outside the semaphore so other jobs use the slot meanwhile
+            await asyncio.sleep(delay)
+            job = job._replace(attempt=job.attempt + 1)
+
+    deferred = []
+    tasks = [asyncio.create_task(run_one(job)) for job in jobs]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            result = await finished
+            if result is None:
+                continue
+            job, value = result
+            on_result(job, value)
+    finally:
+        # Ctrl-C or an exception in on_result: don't leave queued jobs behind
+        for task in tasks:
+            task.cancel()
+    return deferred
+
+
+def run_jobs(jobs, send, on_result, max_in_flight=MAX_IN_FLIGHT, gate=None, defer_after=None):
+    """
+    Blocking wrapper around run_jobs_async() for the coding scripts.
+    Returns the deferred jobs (see 'defer_after').
+    """
+    return asyncio.run(run_jobs_async(jobs, send, on_result, max_in_flight, gate, defer_after))
@@ -0,0 +1,181 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# Console level: warnings and errors only, next to a single progress line.
+# Set CODING_LOG_LEVEL=INFO to also see every call on the terminal.
+LOG_LEVEL = os.environ.get("CODING_LOG_LEVEL", "WARNING").upper()
+
+# Level of the log file written beside the workbook (one line per call at INFO)
+FILE_LOG_LEVEL = os.environ.get("CODING_FILE_LOG_LEVEL", "INFO").upper()
+
+# Log the full prompt of 1 in N calls (0: never)
+PROMPT_SAMPLE = int(os.environ.get("CODING_PROMPT_SAMPLE", "0"))
+
+# Seconds between progress updates (a new line each time when not on a terminal)
+PROGRESS_INTERVAL = 0.5
+PROGRESS_INTERVAL_NO_TTY = 30.0
+
+logger = logging.getLogger("codification")
+
+_listener = None
+_prompt_counter = 0
+_prompt_lock = threading.Lock()
+_progress = None
+
+
+def log_path(excel_path):
+    """
+    Path of the log file of 'excel_path' (Zero.xlsx -> Zero.log).
+    """
+    return os.path.splitext(excel_path)[0] + ".log"
+
+
+class ConsoleHandler(logging.StreamHandler):
+    """
+    Console handler that moves the progress line out of the way of a message.
+    """
+
+    def emit(self, record):
+        progress = _progress
+        if progress is not None and progress.tty:
+            self.stream.write("\r\x1b[K")
+        super().emit(record)
+        if progress is not None and progress.tty:
+            progress.draw()
+
+
+def setup_logging(log_file=None, level=LOG_LEVEL, file_level=FILE_LOG_LEVEL):
+    """
+    Configure the "codification" logger: console output at 'level' and, with
+    'log_file', a file at 'file_level' written by a background thread (the
+    coding loop only puts records on a queue). Calling it again (e.g. for the
+    next workbook) replaces the file.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    console = ConsoleHandler(sys.stderr)
+    console.setLevel(level)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(console)
+
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setLevel(file_level)
+        file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        records = queue.SimpleQueue()
+        queue_handler = QueueHandler(records)
+        queue_handler.setLevel(file_level)
+        logger.addHandler(queue_handler)
+        _listener = QueueListener(records, file_handler, respect_handler_level=True)
+        _listener.start()
+    return logger
+
+
+def stop_logging():
+    """
+    Write the queued records and close the log file.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def log_prompt(prompt, row_idx, code_name):
+    """
+    Log the full prompt of 1 in PROMPT_SAMPLE calls.
+    """
+    global _prompt_counter
+    if PROMPT_SAMPLE <= 0:
+        return
+    with _prompt_lock:
+        _prompt_counter += 1
+        sampled = _prompt_counter % PROMPT_SAMPLE == 1 or PROMPT_SAMPLE == 1
+    if sampled:
+        logger.info("prompt row=%d code=%r\n%s", row_idx + 1, code_name, prompt)
+
+
+def log_call(row_idx, code_name, label, latency=None, probability=None):
+    """
+    One compact line per coded cell: row, construct, label and latency.
+    """
+    extra = f" latency={latency:.2f}s" if latency is not None else ""
+    if probability is not None:
+        extra += f" p1={probability:.3f}"
+    logger.info("row=%d code=%r label=%s%s", row_idx + 1, code_name, label, extra)
+
+
+class Progress:
+    """
+    Single progress line on stderr: cells done, rate, errors and ETA. Redrawn in
+    place on a terminal; printed as a new line every PROGRESS_INTERVAL_NO_TTY
+    seconds otherwise (nohup, redirected output).
+    """
+
+    def __init__(self, total, label="cells"):
+        global _progress
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+        self.last_draw = 0.0
+        self.drawn = -1
+        self.tty = sys.stderr.isatty()
+        self.interval = PROGRESS_INTERVAL if self.tty else PROGRESS_INTERVAL_NO_TTY
+        self.lock = threading.Lock()
+        _progress = self
+
+    def line(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        percent = 100 * self.done / self.total if self.total else 100.0
+        eta = (self.total - self.done) / rate if rate else 0.0
+        return (f"⏳ {self.done}/{self.total} {self.label} ({percent:.1f}%) · {rate:.2f} {self.label}/s · "
+                f"{self.errors} errors · ETA {time.strftime('%H:%M:%S', time.gmtime(eta))}")
+
+    def draw(self):
+        if self.tty:
+            sys.stderr.write("\r\x1b[K" + self.line())
+        else:
+            sys.stderr.write(self.line() + "\n")
+        sys.stderr.flush()
+        self.last_draw = time.perf_counter()
+        self.drawn = self.done
+
+    def update(self, done=1, errors=0):
+        with self.lock:
+            self.done += done
+            self.errors += errors
+            if time.perf_counter() - self.last_draw >= self.interval or self.done >= self.total:
+                self.draw()
+
+    def close(self):
+        global _progress
+        with self.lock:
+            if self.drawn != self.done:
+                self.draw()
+            if self.tty:
+                sys.stderr.write("\n")
+                sys.stderr.flush()
+            _progress = None
@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import threading
+import numpy as np
+
+# Suffix of the per-call log written beside the workbook
+CALL_LOG_SUFFIX = "_calls.jsonl"
+
+# Lines kept in memory before they are appended to the log
+LOG_BUFFER = 500
+
+
+def call_log_path(excel_path):
+    """
+    Path of the per-call log of 'excel_path' (Zero.xlsx -> Zero_calls.jsonl).
+    """
+    return os.path.splitext(excel_path)[0] + CALL_LOG_SUFFIX
+
+
+def call_record(response_json, row_idx, code_name, elapsed):
+    """
+    Compact record of one Ollama call from its response metadata. Durations
+    are converted from nanoseconds to seconds; 'wall' is the time the client
+    waited, including any queueing on the server.
+    """
+    return {
+        "row": row_idx + 1,
+        "code": code_name,
+        "model": response_json.get("model"),
+        "wall": round(elapsed, 4),
+        "total": round(response_json.get("total_duration", 0) / 1e9, 4),
+        "load": round(response_json.get("load_duration", 0) / 1e9, 4),
+        "prefill": round(response_json.get("prompt_eval_duration", 0) / 1e9, 4),
+        "decode": round(response_json.get("eval_duration", 0) / 1e9, 4),
+        "in": response_json.get("prompt_eval_count", 0),
+        "out": response_json.get("eval_count", 0),
+    }
+
+
+def summarize(records):
+    """
+    Per-construct and per-model summary of call records (keyed by (construct,
+    model), so the cheap and large calls of a cascade stay apart): prefill vs
+    decode time, tokens/s and wall latency percentiles.
+    """
+    by_code = {}
+    for record in records:
+        by_code.setdefault((record["code"], record.get("model")), []).append(record)
+
+    summary = {}
+    for key, calls in by_code.items():
+        wall = np.array([call["wall"] for call in calls])
+        prefill = sum(call["prefill"] for call in calls)
+        decode = sum(call["decode"] for call in calls)
+        tokens_in = sum(call["in"] for call in calls)
+        tokens_out = sum(call["out"] for call in calls)
+        p50, p95, p99 = np.percentile(wall, [50, 95, 99])
+        summary[key] = {
+            "calls": len(calls),
+            "prompt_tokens": round(tokens_in / len(calls), 1),
+            "prefill_seconds": round(prefill, 3),
+            "decode_seconds": round(decode, 3),
+            "load_seconds": round(sum(call["load"] for call in calls), 3),
+            "prefill_tokens_per_second": round(tokens_in / prefill, 1) if prefill else None,
+            "decode_tokens_per_second": round(tokens_out / decode, 1) if decode else None,
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+        }
+    return summary
+
+
+def print_summary(summary):
+    """
+    Print the table returned by summarize() and which stage dominates.
+    """
+    print(f"{'construct':<24}{'model':<16}{'calls':>6}{'tok in':>8}{'prefill s':>11}{'decode s':>10}"
+          f"{'pre tok/s':>11}{'dec tok/s':>11}{'p50':>8}{'p95':>8}{'p99':>8}")
+    for (code, model), stats in summary.items():
+        print(f"{code[:23]:<24}{str(model or '-')[:15]:<16}{stats['calls']:>6}{stats['prompt_tokens']:>8}"
+              f"{stats['prefill_seconds']:>11}"
+              f"{stats['decode_seconds']:>10}{str(stats['prefill_tokens_per_second']):>11}"
+              f"{str(stats['decode_tokens_per_second']):>11}{stats['p50']:>8}{stats['p95']:>8}{stats['p99']:>8}")
+    prefill = sum(stats["prefill_seconds"] for stats in summary.values())
+    decode = sum(stats["decode_seconds"] for stats in summary.values())
+    if prefill + decode:
+        bottleneck = "prompt length (prefill)" if prefill >= decode else "generation (decode)"
+        print(f"🔎 {100 * prefill / (prefill + decode):.0f}% of model time is prefill: the bottleneck is {bottleneck}")
+
+
+class CallMetrics:
+    """
+    Collects the timing metadata of every fresh Ollama response (cached answers
+    are skipped) and appends it, one JSON line per call, to the open log.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.pending = []
+        self.path = None
+        self.lock = threading.Lock()
+
+    def open(self, path):
+        """
+        Start a new run logging to 'path' (appended to, so resumed runs keep
+        the calls of the previous attempt).
+        """
+        with self.lock:
+            self.records = []
+            self.pending = []
+            self.path = path
+
+    def observe(self, response_json, row_idx, code_name, elapsed):
+        record = call_record(response_json, row_idx, code_name, elapsed)
+        with self.lock:
+            self.records.append(record)
+            self.pending.append(record)
+            if len(self.pending) >= LOG_BUFFER:
+                self.flush_locked()
+
+    def flush_locked(self):
+        if self.path is None or not self.pending:
+            self.pending = []
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in self.pending)
+        self.pending = []
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def report(self):
+        """
+        Flush the log and print the per-construct and per-model summary of this run.
+        """
+        self.flush()
+        with self.lock:
+            records = list(self.records)
+        if not records:
+            return None
+        summary = summarize(records)
+        print(f"\n⏱️ Per-call timings ({len(records)} calls" + (f", log: {self.path}" if self.path else "") + ")")
+        print_summary(summary)
+        return summary
+
+
+CALLS = CallMetrics()
+
+
+def main(paths):
+    """
+    Summarize existing call logs: python -m codification.metrics Zero_calls.jsonl ...
+    """
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    print(f"⏱️ {len(records)} calls from {len(paths)} log(s)")
+    print_summary(summarize(records))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
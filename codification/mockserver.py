@@ -0,0 +1,339 @@
+"""
+Local stand-in for the Ollama and OpenAI servers, for offline benchmarks and tests.
+
+Implements POST /api/generate (Ollama) and POST /v1/chat/completions (OpenAI)
+with configurable latency, a limited number of parallel slots (like
+OLLAMA_NUM_PARALLEL), error injection (timeouts, HTTP 500, malformed answers)
+and labels derived from a hash of the prompt, so the same prompt always gets
+the same answer. GET / and GET /api/tags answer like Ollama for health checks;
+GET /mock/stats returns the request counters. Every JSON answer carries
+"mock": true, so it is never stored in the shared response cache.
+
+Usage: python -m codification.mockserver [--port 11434] [--latency 0.5] ...
+"""
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_PORT = 11434
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+
+class MockConfig:
+    """
+    Behaviour of the mock server. Latencies are in seconds; the error rates are
+    the probability of each failure per request.
+    """
+
+    def __init__(self, latency=0.0, latency_distribution="fixed", latency_spread=0.0,
+                 prefill_per_token=0.0, decode_per_token=0.0, num_parallel=4,
+                 error_rate=0.0, timeout_rate=0.0, malformed_rate=0.0, hang_seconds=30.0,
+                 positive_rate=0.3, seed=42):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"❌ Unknown latency distribution '{latency_distribution}'")
+        self.latency = latency
+        self.latency_distribution = latency_distribution
+        self.latency_spread = latency_spread
+        self.prefill_per_token = prefill_per_token
+        self.decode_per_token = decode_per_token
+        self.num_parallel = num_parallel
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.malformed_rate = malformed_rate
+        self.hang_seconds = hang_seconds
+        self.positive_rate = positive_rate
+        self.seed = seed
+
+
+def unit_hash(*parts):
+    """
+    Deterministic number in [0, 1) from the given strings.
+    """
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+def token_count(text):
+    """
+    Rough token count (about four characters per token).
+    """
+    return max(1, len(text) // 4)
+
+
+class MockBackend:
+    """
+    Shared state of the server: configuration, random source, parallel slots
+    and request counters. Safe to use from the handler threads.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.slots = threading.Semaphore(config.num_parallel)
+        self.stats = {"requests": 0, "ok": 0, "errors": 0, "timeouts": 0, "malformed": 0,
+                      "in_flight": 0, "max_in_flight": 0}
+
+    def count(self, field, delta=1):
+        with self.lock:
+            self.stats[field] += delta
+            if field == "in_flight":
+                self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+    def draw(self):
+        """
+        Pick the outcome of a request and its base latency.
+        """
+        config = self.config
+        with self.lock:
+            roll = self.random.random()
+            if config.latency_distribution == "fixed":
+                latency = config.latency
+            elif config.latency_distribution == "uniform":
+                latency = self.random.uniform(config.latency - config.latency_spread, config.latency + config.latency_spread)
+            elif config.latency_distribution == "normal":
+                latency = self.random.gauss(config.latency, config.latency_spread)
+            elif config.latency_distribution == "lognormal":
+                # 'latency' is the median, 'latency_spread' the sigma of the log
+                latency = config.latency * math.exp(self.random.gauss(0.0, config.latency_spread))
+            else:
+                latency = self.random.expovariate(1.0 / config.latency) if config.latency > 0 else 0.0
+        if roll < config.timeout_rate:
+            outcome = "timeout"
+        elif roll < config.timeout_rate + config.error_rate:
+            outcome = "error"
+        elif roll < config.timeout_rate + config.error_rate + config.malformed_rate:
+            outcome = "malformed"
+        else:
+            outcome = "ok"
+        return outcome, max(0.0, latency)
+
+    def label(self, prompt, key=""):
+        return 1 if unit_hash(self.config.seed, prompt, key) < self.config.positive_rate else 0
+
+    def probability(self, prompt):
+        """
+        Deterministic P("1") consistent with label(prompt).
+        """
+        u = unit_hash(self.config.seed, prompt, "p")
+        return 0.5 + u / 2 if self.label(prompt) else 0.5 - u / 2
+
+    def answer(self, prompt, output_format=None):
+        """
+        Text of the answer: a JSON object for multi-construct schemas, a summary
+        for summary prompts, else a 0/1 label.
+        """
+        if isinstance(output_format, dict) and "properties" in output_format:
+            return json.dumps({key: self.label(prompt, key) for key in output_format["properties"]})
+        if "summary" in prompt.lower() and output_format is None:
+            return f"Mock summary {hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]} of the previous items."
+        return str(self.label(prompt))
+
+
+def ollama_response(backend, body, elapsed):
+    """
+    /api/generate answer with the timing metadata of a real Ollama server.
+    """
+    prompt = str(body.get("prompt", ""))
+    text = backend.answer(prompt, body.get("format"))
+    prompt_tokens, answer_tokens = token_count(prompt), token_count(text)
+    prefill = prompt_tokens * backend.config.prefill_per_token
+    response = {
+        "model": body.get("model", "mock"),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "response": text,
+        "done": True,
+        "done_reason": "stop",
+        "total_duration": int(elapsed * 1e9),
+        "load_duration": 0,
+        "prompt_eval_count": prompt_tokens,
+        "prompt_eval_duration": int(prefill * 1e9),
+        "eval_count": answer_tokens,
+        "eval_duration": int(max(0.0, elapsed - prefill) * 1e9),
+        "mock": True,
+    }
+    if body.get("logprobs") and text in ("0", "1"):
+        p1 = backend.probability(prompt)
+        top = [{"token": "1", "logprob": math.log(max(p1, 1e-12))}, {"token": "0", "logprob": math.log(max(1 - p1, 1e-12))}]
+        response["logprobs"] = [{"token": text, "logprob": top[0 if text == "1" else 1]["logprob"], "top_logprobs": top}]
+    return response
+
+
+def openai_response(backend, body, elapsed):
+    """
+    /v1/chat/completions answer.
+    """
+    messages = body.get("messages") or []
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    text = backend.answer(prompt)
+    choice = {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+    if body.get("logprobs") and text in ("0", "1"):
+        p1 = backend.probability(prompt)
+        top = [{"token": "1", "logprob": math.log(max(p1, 1e-12))}, {"token": "0", "logprob": math.log(max(1 - p1, 1e-12))}]
+        choice["logprobs"] = {"content": [{"token": text, "logprob": top[0 if text == "1" else 1]["logprob"], "top_logprobs": top}]}
+    return {
+        "id": f"chatcmpl-mock-{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [choice],
+        "usage": {"prompt_tokens": token_count(prompt), "completion_tokens": token_count(text),
+                  "total_tokens": token_count(prompt) + token_count(text)},
+        "mock": True,
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like Ollama
+    disable_nagle_algorithm = True  # otherwise delayed ACKs add ~40 ms per keep-alive request
+
+    def send_json(self, status, payload):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/":
+            data = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif self.path == "/api/tags":
+            self.send_json(200, {"models": [{"name": "llama3.3:70b", "model": "llama3.3:70b"}]})
+        elif self.path == "/mock/stats":
+            with self.server.backend.lock:
+                self.send_json(200, dict(self.server.backend.stats))
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        backend = self.server.backend
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        if self.path not in ("/api/generate", "/v1/chat/completions"):
+            self.send_json(404, {"error": "not found"})
+            return
+        try:
+            body = json.loads(raw)
+        except json.JSONDecodeError:
+            self.send_json(400, {"error": "invalid JSON body"})
+            return
+
+        backend.count("requests")
+        outcome, latency = backend.draw()
+        with backend.slots:
+            backend.count("in_flight")
+            started = time.perf_counter()
+            try:
+                if outcome == "timeout":
+                    # Hang, then drop the connection without answering
+                    backend.count("timeouts")
+                    time.sleep(backend.config.hang_seconds)
+                    self.close_connection = True
+                    return
+                prompt = str(body.get("prompt", "")) + json.dumps(body.get("messages", ""))
+                num_predict = (body.get("options") or {}).get("num_predict") or body.get("max_tokens") or 2
+                time.sleep(latency + token_count(prompt) * backend.config.prefill_per_token
+                           + min(num_predict, 64) * backend.config.decode_per_token)
+                elapsed = time.perf_counter() - started
+            finally:
+                backend.count("in_flight", -1)
+
+        if outcome == "error":
+            backend.count("errors")
+            self.send_json(500, {"error": "mock internal server error"})
+        elif outcome == "malformed":
+            backend.count("malformed")
+            # Half of the malformed answers are not JSON, the other half are not a label
+            if unit_hash(backend.config.seed, raw, "malformed") < 0.5:
+                self.send_json(200, b'{"response": "1", "done": tru')
+            elif self.path == "/api/generate":
+                self.send_json(200, {"model": body.get("model"), "response": "I would say maybe.", "done": True,
+                                     "mock": True})
+            else:
+                self.send_json(200, {"choices": [{"index": 0, "message": {"role": "assistant", "content": "I would say maybe."}}],
+                                     "mock": True})
+        else:
+            backend.count("ok")
+            if self.path == "/api/generate":
+                self.send_json(200, ollama_response(backend, body, elapsed))
+            else:
+                self.send_json(200, openai_response(backend, body, elapsed))
+
+    def log_message(self, *args):
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, MockHandler)
+        self.backend = MockBackend(config)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_mock_server(port=0, host="127.0.0.1", config=None):
+    """
+    Start a mock server in a background thread and return it. Port 0 picks a
+    free port; the base URL is server.url. Stop it with server.shutdown().
+    """
+    server = MockServer((host, port), config or MockConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock Ollama / OpenAI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean (median for lognormal) seconds per request")
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--spread", type=float, default=0.0, help="half-width (uniform), std (normal) or log-sigma (lognormal)")
+    parser.add_argument("--prefill-per-token", type=float, default=0.0)
+    parser.add_argument("--decode-per-token", type=float, default=0.0)
+    parser.add_argument("--num-parallel", type=int, default=4)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an HTTP 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="probability of hanging without answering")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="probability of a malformed answer")
+    parser.add_argument("--hang-seconds", type=float, default=30.0)
+    parser.add_argument("--positive-rate", type=float, default=0.3, help="share of prompts labelled 1")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    config = MockConfig(
+        latency=args.latency, latency_distribution=args.distribution, latency_spread=args.spread,
+        prefill_per_token=args.prefill_per_token, decode_per_token=args.decode_per_token,
+        num_parallel=args.num_parallel, error_rate=args.error_rate, timeout_rate=args.timeout_rate,
+        malformed_rate=args.malformed_rate, hang_seconds=args.hang_seconds,
+        positive_rate=args.positive_rate, seed=args.seed,
+    )
+    server = MockServer((args.host, args.port), config)
+    print(f"🧪 Mock Ollama/OpenAI server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"📊 {json.dumps(server.backend.stats)}")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import re
+import json
+
+
+def multi_construct_prompt(row, constructs, examples=False, summary=False):
+    """
+    Build one prompt that asks for all constructs of a row at once.
+    'constructs' is a list of (code_name, code_definition, code_example).
+    With 'examples' / 'summary' the few-shot examples and the summary of the
+    previous items are included, like the FS and Context prompts.
+    """
+    text_for_prompt = (
+        f"Learning activity:\n"
+        f"Activity description: {row['activity_description']}.\n"
+        f"Embedded media content description: {row['embed_description']}.\n"
+    )
+
+    construct_lines = []
+    for code_name, code_definition, code_example in constructs:
+        line = f"- `{code_name}`: {code_definition}"
+        if examples:
+            line += f" Examples: `{code_example}`."
+        construct_lines.append(line)
+    construct_text = "\n".join(construct_lines)
+
+    context_text = ""
+    if summary:
+        context_text = f"For additional context, here is a summary of the 3 previous items: `{row['previous_summary']}`. \n"
+
+    return (
+        f"You are a qualitative coding expert. You are assessing the student engagement of learning activities created by teachers in a inquiry-based learning digital platform. \n"
+        f"These activities may have different media content including text and embedded artifacts (e.g., images, videos, apps, labs). Please review the provided activity description and code it based on each of the following constructs and their definitions:\n"
+        f"{construct_text}\n"
+        f"{context_text}"
+        f"After reviewing the text, answer with a JSON object with one key per construct, written exactly as above, and the value 1 if you believe the text exemplifies that construct or 0 if it does not. Your response should only be the JSON object.\n\n"
+        f"Text: `{text_for_prompt}`"
+    )
+
+
+def multi_construct_format(code_names):
+    """
+    JSON schema for Ollama's 'format' field: one required 0/1 key per construct.
+    """
+    return {
+        "type": "object",
+        "properties": {name: {"type": "integer", "enum": [0, 1]} for name in code_names},
+        "required": list(code_names),
+    }
+
+
+def parse_multi_response(api_response, code_names):
+    """
+    Parse the answer to a multi-construct prompt.
+    Accepts a JSON object keyed by construct name, or a bit string with one
+    '0'/'1' per construct in prompt order. Returns {code_name: '0' or '1'} for
+    the constructs that got a valid answer; missing ones need a single-construct retry.
+    """
+    if not api_response:
+        return {}
+
+    match = re.search(r"\{.*\}", api_response, re.DOTALL)
+    if match:
+        try:
+            answer = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            answer = None
+        if isinstance(answer, dict):
+            answer = {str(key).strip().strip("`").lower(): value for key, value in answer.items()}
+            labels = {}
+            for name in code_names:
+                value = answer.get(name.lower())
+                if isinstance(value, bool):
+                    continue
+                if str(value).strip() in ("0", "1"):
+                    labels[name] = str(value).strip()
+            return labels
+
+    bits = re.sub(r"[\s,;|]", "", api_response)
+    if re.fullmatch(r"[01]+", bits) and len(bits) == len(code_names):
+        return dict(zip(code_names, bits))
+    return {}
+
+
+def covers_all(code_names):
+    """
+    Validator for the response JSON of a multi-construct request: true only when
+    parse_multi_response() finds a label for every one of 'code_names', so a
+    truncated or partial answer is not cached.
+    """
+    def validate(response_json):
+        labels = parse_multi_response(str(response_json.get("response", "")).strip(), code_names)
+        return len(labels) == len(code_names)
+    return validate
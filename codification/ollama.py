@@ -0,0 +1,178 @@
+import json
+import time
+import requests
+
+from codification.cache import BYPASS, cache_lookup, post_and_cache
+from codification.client import CONNECT_TIMEOUT
+from codification.logs import logger
+from codification.metrics import CALLS
+from codification.pool import API_URLS, POOL
+from codification.retry import BREAKER, MAX_ATTEMPTS, REQUEST_DEADLINE, RetryLater, backoff_delay
+from codification.scoring import OLLAMA_LOGPROB_FIELDS, ollama_label_probability
+from codification.stages import STAGES
+from codification.warmup import KEEP_ALIVE, RESIDENCY
+
+# Constants
+# First endpoint of the pool, for the helpers that talk to a single server
+API_URL = API_URLS[0]
+MODEL = "llama3.3:70b"
+
+# Decoding profile for the 0/1 coding calls. Sampling settings must go in
+# "options": Ollama ignores a top-level "temperature". The answer is one token,
+# so generation is capped at 2 tokens, and where the server supports structured
+# outputs (Ollama >= 0.5) the JSON schema in "format" only allows 0 or 1.
+DECODING_OPTIONS = {
+    "temperature": 0.0,
+    "seed": 42,
+    "num_predict": 2,
+    "stop": ["\n"],
+}
+LABEL_FORMAT = {"type": "integer", "enum": [0, 1]}
+
+
+def build_payload(prompt, model=MODEL, options=None, output_format=LABEL_FORMAT):
+    """
+    Prepare data payload for a coding request with the decoding profile above.
+    'options' entries override DECODING_OPTIONS; pass output_format=None for
+    servers without structured outputs.
+    """
+    data_payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "keep_alive": KEEP_ALIVE,
+        "options": {**DECODING_OPTIONS, **(options or {})},
+    }
+    if output_format is not None:
+        data_payload["format"] = output_format
+    return data_payload
+
+
+def request_attempt(data_payload, row_idx, code_name, validate=None, bypass=BYPASS):
+    """
+    Answer from the response cache, or make one request to the least busy
+    endpoint, abandoned after REQUEST_DEADLINE seconds. Only cache misses take
+    an endpoint. Responses for which 'validate(response_json)' is false are
+    neither stored nor taken from the cache; with 'bypass' the cache is not read.
+    Records the outcome in the circuit breaker and raises the requests and JSON
+    errors of a failed attempt.
+    """
+    with STAGES.time("request"):
+        response_json = cache_lookup(data_payload, bypass=bypass, validate=validate)
+    if response_json is not None:
+        BREAKER.record(None)
+        return response_json
+
+    started = time.perf_counter()
+    try:
+        with STAGES.time("request"), POOL.endpoint() as api_url:
+            response_json = post_and_cache(api_url, data_payload, timeout=(CONNECT_TIMEOUT, REQUEST_DEADLINE),
+                                           validate=validate)
+    except requests.exceptions.RequestException:
+        BREAKER.record(False)
+        raise
+    except json.JSONDecodeError:
+        # The server answered, just not with JSON: not a reason to pause dispatch
+        BREAKER.record(None)
+        raise
+    BREAKER.record(True)
+    RESIDENCY.observe(response_json, row_idx, code_name)
+    CALLS.observe(response_json, row_idx, code_name, time.perf_counter() - started)
+    return response_json
+
+
+def request_ollama(data_payload, row_idx, code_name, attempt=None, validate=None, bypass=BYPASS):
+    """
+    Send 'data_payload' to the Ollama API, making up to MAX_ATTEMPTS attempts
+    with jittered exponential backoff between them (see retry.py). Each attempt
+    goes to the least busy healthy endpoint of the pool (pool.py). Identical
+    requests are answered from the response cache (see cache.py).
+    With 'attempt' (the engine's attempt number of this job) only that attempt
+    is made, and a failure raises RetryLater instead of sleeping, so the
+    in-flight slot goes to other jobs during the backoff. 'validate' and
+    'bypass' are passed on to request_attempt().
+    Returns the decoded response JSON, or None if every attempt failed.
+    """
+    first = 0 if attempt is None else attempt
+    last = MAX_ATTEMPTS if attempt is None else min(attempt + 1, MAX_ATTEMPTS)
+    for n in range(first, last):
+        if attempt is None:
+            BREAKER.wait()
+        try:
+            return request_attempt(data_payload, row_idx, code_name, validate, bypass)
+        except requests.exceptions.RequestException as req_err:
+            logger.warning(f"❌ API connection error for row {row_idx+1}, code '{code_name}' "
+                           f"(attempt {n+1}/{MAX_ATTEMPTS}): {req_err}")
+        except json.JSONDecodeError as json_err:
+            logger.warning(f"⚠️ JSON decode error for row {row_idx+1}, code '{code_name}' "
+                           f"(attempt {n+1}/{MAX_ATTEMPTS}): {json_err}")
+
+        if n == MAX_ATTEMPTS - 1:
+            break
+        # After a failed attempt, back off before the next one
+        delay = backoff_delay(n)
+        if attempt is not None:
+            raise RetryLater(delay)
+        time.sleep(delay)
+
+    logger.error(f"🚨 Max retries reached for row {row_idx+1}. Moving to next item.")
+    return None
+
+
+def generate(data_payload, row_idx, code_name, attempt=None, validate=None, bypass=BYPASS):
+    """
+    Like request_ollama(), but returns only the stripped response text (or None).
+    """
+    response_json = request_ollama(data_payload, row_idx, code_name, attempt, validate, bypass)
+    if response_json is None:
+        return None
+    return response_json.get("response", "").strip()
+
+
+def has_label(response_json):
+    """
+    True if the response text starts with a 0/1 label (what parse_label() accepts).
+    """
+    text = str(response_json.get("response", "")).strip()
+    return text[:1] in ("0", "1")
+
+
+def parse_label(api_response, row_idx, code_name):
+    """
+    Return '0' or '1' from the response text, or 'Error' if it is not a label.
+    """
+    if api_response is None:
+        return "Error"
+
+    with STAGES.time("parse"):
+        # Validate Ollama response
+        if api_response and api_response[0] in ("1", "0"):
+            return api_response[0]  # Only store the first character
+        else:
+            # If Ollama returns something unexpected, log it
+            logger.warning(f"⚠️ Unexpected response format for row {row_idx+1}, code '{code_name}': {api_response}")
+            return "Error"
+
+
+def send_to_ollama(data_payload, row_idx, code_name, attempt=None, bypass=BYPASS):
+    """
+    Send 'data_payload' to the Ollama API (see request_ollama() for the retries).
+    Returns a single-character response ('0' or '1') or 'Error' if unsuccessful.
+    Answers without a label are not cached, so a later run asks again.
+    """
+    return parse_label(generate(data_payload, row_idx, code_name, attempt, has_label, bypass), row_idx, code_name)
+
+
+def score_with_ollama(data_payload, row_idx, code_name, attempt=None, bypass=BYPASS):
+    """
+    Like send_to_ollama(), but also asks for the log-probabilities of the answer
+    token and returns (label, P("1")). P("1") is None if the server has no logprobs.
+    """
+    response_json = request_ollama({**data_payload, **OLLAMA_LOGPROB_FIELDS}, row_idx, code_name, attempt,
+                                   has_label, bypass)
+    if response_json is None:
+        return "Error", None
+    label = parse_label(response_json.get("response", "").strip(), row_idx, code_name)
+    with STAGES.time("parse"):
+        probability = ollama_label_probability(response_json)
+    return label, probability
@@ -0,0 +1,391 @@
+import sys
+import time
+import signal
+import pandas as pd
+from datetime import datetime
+from openpyxl import load_workbook
+from difflib import get_close_matches
+
+from codification.cache import BYPASS, RESPONSE_CACHE
+from codification.cascade import CASCADE, CASCADE_THRESHOLD, cascade_send
+from codification.dedup import describe, duplicate_groups, report_copies, row_text, verify_members
+from codification.engine import CodingJob, MAX_IN_FLIGHT, run_jobs
+from codification.logs import Progress, log_call, log_path, log_prompt, logger, setup_logging, stop_logging
+from codification.metrics import CALLS, call_log_path
+from codification.multicode import covers_all, multi_construct_format, parse_multi_response
+from codification.ollama import MODEL, build_payload, generate, score_with_ollama, send_to_ollama
+from codification.pool import POOL
+from codification.resume import completed_cells
+from codification.retry import BREAKER, INLINE_ATTEMPTS
+from codification.scoring import PROBABILITY_SHEET, probability_sheet
+from codification.sink import FLUSH_EVERY, FLUSH_INTERVAL, ResultSink
+from codification.stages import STAGES
+from codification.textcache import CleanRow, CleanTextCache
+from codification.warmup import RESIDENCY, warm_up_model
+
+# Columns that contain codes in the "Codification" sheet (G..S → 0-based 6..18)
+CODE_COLUMNS = list(range(6, 19))
+
+# Column indices (0-based in pandas)
+ROW_FIELDS = {
+    "lesson_title": 0,          # Lesson title
+    "activity_category": 1,     # Activity category
+    "activity_name": 2,         # Activity name
+    "activity_description": 3,  # Activity description
+    "embed_description": 4,     # Embedded media description
+    "previous_summary": 5,      # Summary of the previous items (Context runs)
+}
+
+# Generation budget per construct for the multi-construct JSON answer
+MULTI_TOKENS_PER_CONSTRUCT = 12
+
+# Fields passed through clean_html() before they reach build_prompt()
+# (the only ones the prompts read)
+CLEANED_FIELDS = ("activity_description", "embed_description")
+
+
+def find_best_match(code_name, available_codes):
+    """
+    Return the single closest match for 'code_name' from 'available_codes',
+    or None if no match exceeds the cutoff.
+    """
+    matches = get_close_matches(code_name, available_codes, n=1, cutoff=0.7)
+    return matches[0] if matches else None
+
+
+def load_code_mappings(codes_sheet):
+    """
+    Build dictionaries for definitions and examples from the "Codes" sheet.
+    """
+    definitions_mapping = {
+        str(row[0]).strip().lower(): (str(row[1]).strip() if not pd.isna(row[1]) else "No definition available")
+        for row in codes_sheet.iloc[1:].values  # Skip header
+    }
+    examples_mapping = {
+        str(row[0]).strip().lower(): (str(row[2]).strip() if not pd.isna(row[2]) else "No example available")
+        for row in codes_sheet.iloc[1:].values
+    }
+    return definitions_mapping, examples_mapping
+
+
+def load_workbook_with_values(excel_path):
+    """
+    Load 'excel_path' for writing, replacing Google Sheets export formulas
+    (=IFERROR(__xludf.DUMMYFUNCTION(...), value)) with their cached value.
+    openpyxl does not keep cached formula results when saving, so without this
+    the activity texts read back as empty after the first save.
+    """
+    workbook = load_workbook(excel_path)
+    values = load_workbook(excel_path, data_only=True, read_only=True)
+    for sheet in workbook.worksheets:
+        formula_cells = [
+            cell for row in sheet.iter_rows() for cell in row
+            if cell.data_type == "f" and "__xludf.DUMMYFUNCTION" in str(cell.value)
+        ]
+        if not formula_cells:
+            continue
+        cached = {
+            (cell.row, cell.column): cell.value
+            for row in values[sheet.title].iter_rows() for cell in row
+            if getattr(cell, "row", None) is not None
+        }
+        for cell in formula_cells:
+            cell.value = cached.get((cell.row, cell.column))
+    values.close()
+    return workbook
+
+
+def read_row(codif_sheet, i, text_cache=None):
+    """
+    Return the fields of row 'i' of the Codification sheet as a dict (see ROW_FIELDS).
+    With a CleanTextCache, the CLEANED_FIELDS are returned already cleaned.
+    """
+    fields = {
+        field: (codif_sheet.iloc[i, col] if col < codif_sheet.shape[1] else None)
+        for field, col in ROW_FIELDS.items()
+    }
+    if text_cache is None:
+        return fields
+    for field in CLEANED_FIELDS:
+        fields[field] = text_cache.clean(fields[field])
+    return CleanRow(fields, text_cache, CLEANED_FIELDS)
+
+
+def run_coding(excel_path, build_prompt, rows, code_columns=CODE_COLUMNS, model=MODEL,
+               max_in_flight=MAX_IN_FLIGHT, timestamp_sheet=None,
+               flush_every=FLUSH_EVERY, flush_interval=FLUSH_INTERVAL, resume=False,
+               multi_prompt=None, score=False, warm_up=True, call_log=True,
+               cascade_model=None, cascade_threshold=CASCADE_THRESHOLD, dedup=None, dedup_verify=0.0,
+               bypass=BYPASS):
+    """
+    Code every (row, construct) cell of the "Codification" sheet of 'excel_path'.
+
+    build_prompt(row, code_name, code_definition, code_example) returns the prompt
+    for one cell, where 'row' is the dict returned by read_row(); its text fields
+    are cleaned once per row up front and cached beside the workbook. Requests are sent
+    concurrently (up to 'max_in_flight') and each answer is written back to its own
+    cell as it arrives. Writes are buffered and the workbook is saved every
+    'flush_every' cells / 'flush_interval' seconds (see ResultSink). If
+    'timestamp_sheet' is given, the time each cell was finished is written to the
+    same cell of that sheet.
+    With 'resume', cells that already hold a valid 0/1 are skipped, so only blank
+    and 'Error' cells of an interrupted run are sent again.
+    With 'multi_prompt(row, constructs)' each row is sent once with every construct
+    (see multicode.py) and only constructs missing from a malformed answer fall
+    back to build_prompt().
+    With 'score', each answer token is requested with its log-probabilities and
+    P("1") is written to the same cell of the "Probability" sheet, so a single
+    run gives both the label and its confidence.
+    Requests are spread over the Ollama endpoints of OLLAMA_API_URLS (see pool.py).
+    A failed request is retried with jittered backoff without holding its
+    in-flight slot, and dispatch pauses while the circuit breaker is open (see retry.py).
+    A cell still failing after INLINE_ATTEMPTS is deferred and retried once the
+    main pass is done, so the main pass keeps streaming.
+    With 'bypass' no answer is taken from the response cache (see cache.py);
+    retries and the deferred pass always bypass it.
+    With 'warm_up' the model is loaded and pinned in memory on each of them
+    before the first job.
+    Progress is shown as a single line; per-call lines (and 1 in
+    CODING_PROMPT_SAMPLE prompts) go to <workbook>.log (see logs.py).
+    With 'cascade_model' (e.g. CASCADE_MODEL) each cell is coded by that cheap
+    model first and only sent to 'model' when its confidence is below
+    'cascade_threshold'; the escalation rate is reported at the end (see cascade.py).
+    With 'dedup' (a similarity, e.g. DEDUP_THRESHOLD) rows whose cleaned activity
+    and embed descriptions are near-duplicates of an earlier row are not sent:
+    they get the labels of that representative row (see dedup.py). A
+    'dedup_verify' fraction of them is coded anyway to check the copied labels.
+    With 'call_log' the Ollama timing metadata of every call is appended to
+    <workbook>_calls.jsonl and summarized per construct at the end (see metrics.py).
+    Returns a dict with the time each construct was finished.
+    """
+    start_time = datetime.now()
+    setup_logging(log_path(excel_path))
+    print(f"\n✅ Script started at: {start_time}")
+
+    # Load the Excel file
+    with STAGES.time("load"):
+        codes_sheet = pd.read_excel(excel_path, sheet_name="Codes", header=None)
+        codif_sheet = pd.read_excel(excel_path, sheet_name="Codification", header=None)
+        definitions_mapping, examples_mapping = load_code_mappings(codes_sheet)
+
+    # Extract the raw code names from the first row of the code columns
+    codes = [str(codif_sheet.iloc[0, col]).strip().lower() for col in code_columns]
+
+    # Create a helper mapping from "raw_code" to "best_matched_code"
+    available_codes = list(definitions_mapping.keys())
+    fixed_codes = {raw: find_best_match(raw, available_codes) or raw for raw in codes}
+
+    # Prepare to write results into the "Codification" sheet
+    with STAGES.time("load"):
+        workbook = load_workbook_with_values(excel_path)
+    if "Codification" not in workbook.sheetnames:
+        raise ValueError("❌ Sheet 'Codification' not found in the Excel file!")
+    if timestamp_sheet and timestamp_sheet not in workbook.sheetnames:
+        raise ValueError(f"❌ Sheet '{timestamp_sheet}' not found in the Excel file!")
+    if score and multi_prompt is not None:
+        raise ValueError("❌ Probability scoring needs one construct per call, it cannot be used with multi_prompt")
+    if cascade_model and (score or multi_prompt is not None):
+        raise ValueError("❌ The cascade codes one construct per call with its own model, "
+                         "it cannot be used with score or multi_prompt")
+    if score:
+        probability_sheet(workbook)
+
+    # Cells finished by a previous (interrupted) run
+    done = completed_cells(codif_sheet, rows, code_columns) if resume else set()
+    if resume:
+        print(f"♻️ Resuming: {len(done)} cells already coded, skipping them")
+
+    # Clean the HTML of every row once, instead of once per construct
+    with STAGES.time("clean"):
+        text_cache = CleanTextCache(excel_path)
+        cleaned_rows = {i: read_row(codif_sheet, i, text_cache) for i in rows}
+        text_cache.save()
+
+    # Near-duplicate rows take the labels of their representative
+    copies = {}
+    representative = {}
+    verified = set()
+    if dedup:
+        groups = duplicate_groups({i: row_text(cleaned_rows[i]) for i in rows}, dedup)
+        verified = verify_members(groups, dedup_verify)
+        copies = {rep: [member for member in members if member not in verified] for rep, members in groups.items()}
+        representative = {member: rep for rep, members in groups.items() for member in members}
+        print(f"🧬 {describe(copies, rows)}" + (f", {len(verified)} rows coded anyway to verify" if verified else ""))
+
+    def copied(i, code_col):
+        # Skipped: the representative of row i is coded in this run and passes its label on
+        rep = representative.get(i)
+        return i not in verified and rep is not None and (rep, code_col) not in done
+
+    # Definitions and examples of every construct, in column order
+    constructs = []
+    for code_col in code_columns:
+        raw_code_name = str(codif_sheet.iloc[0, code_col]).strip().lower()
+        matched_code_name = fixed_codes.get(raw_code_name, raw_code_name)
+        code_definition = definitions_mapping.get(matched_code_name, "No definition available")
+        code_example = examples_mapping.get(matched_code_name, "No example available")
+        constructs.append((code_col, matched_code_name, code_definition, code_example))
+
+    def single_job(i, construct):
+        code_col, code_name, code_definition, code_example = construct
+        with STAGES.time("prompt"):
+            prompt = build_prompt(cleaned_rows[i], code_name, code_definition, code_example)
+            log_prompt(prompt, i, code_name)
+            return CodingJob(i, code_col, code_name, build_payload(prompt, model))
+
+    jobs = []
+    row_constructs = {}
+    if multi_prompt is None:
+        # Build one job per (row, construct), construct by construct like the old loop
+        for construct in constructs:
+            code_col, matched_code_name, code_definition, code_example = construct
+            logger.info(f"🚀 Queueing Code: '{matched_code_name}'")
+            logger.debug(f"📝 Definition: {code_definition}")
+            logger.debug(f"📚 Example: {code_example}")
+
+            for i in rows:
+                if (i, code_col) in done or copied(i, code_col):
+                    continue
+                jobs.append(single_job(i, construct))
+    else:
+        # One job per row asking for every construct still missing in that row
+        for i in rows:
+            pending = [construct for construct in constructs
+                       if (i, construct[0]) not in done and not copied(i, construct[0])]
+            if not pending:
+                continue
+            row_constructs[i] = pending
+            with STAGES.time("prompt"):
+                prompt = multi_prompt(cleaned_rows[i], [construct[1:] for construct in pending])
+                log_prompt(prompt, i, "all constructs")
+                # Room for a '"construct name": 0' entry per construct
+                data_payload = build_payload(
+                    prompt, model,
+                    options={"num_predict": MULTI_TOKENS_PER_CONSTRUCT * len(pending) + 16, "stop": []},
+                    output_format=multi_construct_format([construct[1] for construct in pending]),
+                )
+            jobs.append(CodingJob(i, None, "all constructs", data_payload))
+        logger.info(f"🚀 Queueing {len(jobs)} rows with all constructs in one prompt")
+
+    text_cache.report()
+
+    # Cells left per construct, to report when each construct is finished
+    remaining = {
+        code_name: sum(1 for i in rows if (i, code_col) not in done)
+        for code_col, code_name, _, _ in constructs
+    }
+    remaining_at_start = dict(remaining)
+    finished_at = {}
+    # Labels of the representatives and verified rows, to compare at the end
+    dedup_labels = {}
+    fallback_jobs = []
+
+    def write_cell(i, code_col, code_name, result_value, probability=None, latency=None):
+        log_call(i, code_name, result_value, latency, probability)
+        progress.update(errors=int(result_value == "Error"))
+        # Queue the result for the next workbook save
+        with STAGES.time("write"):
+            sink.write("Codification", i+1, code_col+1, result_value)
+            if score:
+                sink.write(PROBABILITY_SHEET, i+1, code_col+1, probability)
+            if timestamp_sheet:
+                sink.write(timestamp_sheet, i+1, code_col+1, datetime.now())
+
+        remaining[code_name] -= 1
+        if dedup:
+            dedup_labels[(i, code_col)] = result_value
+            for member in copies.get(i, ()):
+                if (member, code_col) not in done:
+                    write_cell(member, code_col, code_name, result_value, probability)
+        if remaining[code_name] == 0:
+            finished_at[code_name] = datetime.now()
+            logger.info(f"✅ Code '{code_name}' finished at: {finished_at[code_name]}")
+
+    def write_result(job, outcome):
+        result_value, latency = outcome
+        if job.code_col is not None:
+            if score:
+                label, probability = result_value
+                write_cell(job.row, job.code_col, job.code_name, label, probability, latency)
+            else:
+                write_cell(job.row, job.code_col, job.code_name, result_value, latency=latency)
+            return
+        # Multi-construct answer: keep the valid labels, re-ask the rest one by one
+        pending = row_constructs[job.row]
+        with STAGES.time("parse"):
+            labels = parse_multi_response(result_value, [construct[1] for construct in pending])
+        for construct in pending:
+            code_col, code_name = construct[0], construct[1]
+            if code_name in labels:
+                write_cell(job.row, code_col, code_name, labels[code_name], latency=latency)
+            else:
+                fallback_jobs.append(single_job(job.row, construct))
+        if len(labels) < len(pending):
+            logger.warning(f"⚠️ Row {job.row+1}: {len(pending) - len(labels)} constructs missing from the answer, "
+                  f"asking them one by one")
+
+    def send(job, retry_pass=False):
+        # Returns (result, seconds) so the per-call log line can show the latency
+        started = time.perf_counter()
+        # A retried cell asks the model again instead of replaying the cache
+        fresh = bypass or retry_pass or job.attempt > 0
+        if job.code_col is None:
+            names = [construct[1] for construct in row_constructs[job.row]]
+            result_value = generate(job.payload, job.row, job.code_name, job.attempt, covers_all(names), fresh)
+        elif score:
+            result_value = score_with_ollama(job.payload, job.row, job.code_name, job.attempt, fresh)
+        elif cascade_model:
+            result_value = cascade_send(job.payload, job.row, job.code_name, cascade_model, cascade_threshold,
+                                        job.attempt, fresh)
+        else:
+            result_value = send_to_ollama(job.payload, job.row, job.code_name, job.attempt, fresh)
+        return result_value, time.perf_counter() - started
+
+    sink = ResultSink(workbook, excel_path, flush_every, flush_interval)
+
+    CALLS.open(call_log_path(excel_path) if call_log else None)
+    if jobs:
+        # Drop unreachable endpoints before the first request
+        for api_url in POOL.check():
+            if warm_up:
+                warm_up_model(api_url, model)
+                if cascade_model:
+                    warm_up_model(api_url, cascade_model)
+
+    print(f"📤 Sending {len(jobs)} requests with up to {max_in_flight} in flight")
+    progress = Progress(sum(remaining.values()))
+    # Turn SIGTERM (e.g. a killed job) into a normal exit so the buffer is flushed
+    previous_sigterm = signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    try:
+        deferred = run_jobs(jobs, send, write_result, max_in_flight, gate=BREAKER, defer_after=INLINE_ATTEMPTS)
+        if deferred:
+            # Cells that kept failing in the main pass, retried now it is done
+            logger.warning(f"🔁 Retrying {len(deferred)} failed requests after the main pass")
+            run_jobs([job._replace(attempt=0) for job in deferred], lambda job: send(job, retry_pass=True),
+                     write_result, max_in_flight, gate=BREAKER)
+        if fallback_jobs:
+            logger.info(f"📤 Sending {len(fallback_jobs)} single-construct fallback requests")
+            run_jobs(fallback_jobs, send, write_result, max_in_flight, gate=BREAKER)
+    finally:
+        # None: the previous handler was not installed from Python
+        signal.signal(signal.SIGTERM, previous_sigterm if previous_sigterm is not None else signal.SIG_DFL)
+        progress.close()
+        # Finalize
+        with STAGES.time("write"):
+            sink.close()
+        workbook.close()
+        RESPONSE_CACHE.report()
+        RESIDENCY.report()
+        POOL.report()
+        BREAKER.report()
+        CASCADE.report()
+        if dedup:
+            report_copies(copies, representative, verified, dedup_labels, sum(remaining_at_start.values()))
+        CALLS.report()
+        stop_logging()
+
+    end_time = datetime.now()
+    print("\n✅ Results successfully written to the Excel file.")
+    print(f"✅ Script started at: {start_time}")
+    print(f"✅ Script finished at: {end_time}")
+    return finished_at
@@ -0,0 +1,178 @@
+import os
+import time
+import threading
+import requests
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit
+
+from codification.client import get_session
+from codification.logs import logger
+
+# Ollama generate endpoints to spread the coding requests over, comma separated:
+# OLLAMA_API_URLS="http://localhost:11434/api/generate,http://gpu2:11434/api/generate"
+# Falls back to the single OLLAMA_API_URL.
+DEFAULT_API_URL = "http://localhost:11434/api/generate"
+API_URLS = [
+    url.strip()
+    for url in os.environ.get("OLLAMA_API_URLS", os.environ.get("OLLAMA_API_URL", DEFAULT_API_URL)).split(",")
+    if url.strip()
+]
+
+# Seconds between health checks of the endpoints taken out of the pool
+HEALTH_INTERVAL = 10.0
+
+# Timeout of a health check (GET / answers "Ollama is running" immediately)
+HEALTH_TIMEOUT = 3.0
+
+
+def health_url(api_url):
+    """
+    Root URL of the server behind 'api_url' (.../api/generate -> .../).
+    """
+    parts = urlsplit(api_url)
+    return urlunsplit((parts.scheme, parts.netloc, "/", "", ""))
+
+
+class Endpoint:
+    """
+    One Ollama server of the pool and its request counters.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.healthy = True
+        self.outstanding = 0
+        self.served = 0
+        self.failures = 0
+        self.down_since = None
+        self.downtime = 0.0
+
+    def check(self):
+        """
+        True if the server answers its health check.
+        """
+        try:
+            response = get_session().get(health_url(self.url), timeout=HEALTH_TIMEOUT)
+            return response.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+
+class BackendPool:
+    """
+    Routes each request to the healthy endpoint with the fewest requests in
+    flight. An endpoint whose request fails and which then fails its health
+    check is taken out of the pool; a background thread checks it again every
+    HEALTH_INTERVAL seconds and puts it back once it answers, where it picks up
+    new requests first since it has none outstanding. With every endpoint down
+    the requests still go out (to the least loaded one) and fail fast, so the
+    retry logic of the caller decides what happens to them.
+    """
+
+    def __init__(self, urls=None):
+        self.endpoints = [Endpoint(url) for url in (urls or API_URLS)]
+        self.lock = threading.Lock()
+        self.checker = None
+
+    @property
+    def urls(self):
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def healthy_urls(self):
+        with self.lock:
+            return [endpoint.url for endpoint in self.endpoints if endpoint.healthy]
+
+    def acquire(self):
+        """
+        Pick the endpoint for the next request and count it as outstanding.
+        """
+        with self.lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint.healthy] or self.endpoints
+            endpoint = min(candidates, key=lambda candidate: candidate.outstanding)
+            endpoint.outstanding += 1
+            return endpoint
+
+    def release(self, endpoint, ok=True):
+        with self.lock:
+            endpoint.outstanding -= 1
+            if ok:
+                endpoint.served += 1
+            else:
+                endpoint.failures += 1
+        if not ok and endpoint.healthy and not endpoint.check():
+            self.mark_down(endpoint)
+
+    @contextmanager
+    def endpoint(self):
+        """
+        with POOL.endpoint() as url: ... -- the request counts as failed if the
+        block raises a requests exception.
+        """
+        endpoint = self.acquire()
+        try:
+            yield endpoint.url
+        except requests.exceptions.RequestException:
+            self.release(endpoint, ok=False)
+            raise
+        except BaseException:
+            self.release(endpoint)
+            raise
+        self.release(endpoint)
+
+    def mark_down(self, endpoint):
+        with self.lock:
+            if not endpoint.healthy:
+                return
+            endpoint.healthy = False
+            endpoint.down_since = time.monotonic()
+            left = sum(1 for other in self.endpoints if other.healthy)
+            if self.checker is None or not self.checker.is_alive():
+                self.checker = threading.Thread(target=self.check_loop, name="ollama-health", daemon=True)
+                self.checker.start()
+        logger.warning(f"🚫 Ollama endpoint {endpoint.url} failed its health check, "
+                       f"removed from the pool ({left} of {len(self.endpoints)} left)")
+
+    def mark_up(self, endpoint):
+        with self.lock:
+            if endpoint.healthy:
+                return
+            endpoint.healthy = True
+            endpoint.downtime += time.monotonic() - endpoint.down_since
+            endpoint.down_since = None
+        logger.warning(f"✅ Ollama endpoint {endpoint.url} is back, returned to the pool")
+
+    def check_loop(self):
+        # Runs while some endpoint is out of the pool
+        while True:
+            time.sleep(HEALTH_INTERVAL)
+            with self.lock:
+                down = [endpoint for endpoint in self.endpoints if not endpoint.healthy]
+            if not down:
+                return
+            for endpoint in down:
+                if endpoint.check():
+                    self.mark_up(endpoint)
+
+    def check(self):
+        """
+        Health-check every endpoint now (e.g. before a run) and return the healthy URLs.
+        """
+        for endpoint in self.endpoints:
+            if endpoint.check():
+                self.mark_up(endpoint)
+            else:
+                self.mark_down(endpoint)
+        return self.healthy_urls()
+
+    def report(self):
+        if len(self.endpoints) < 2:
+            return
+        print(f"🌐 Ollama pool ({len(self.endpoints)} endpoints):")
+        for endpoint in self.endpoints:
+            downtime = endpoint.downtime + (time.monotonic() - endpoint.down_since if endpoint.down_since else 0.0)
+            state = "up" if endpoint.healthy else "down"
+            print(f"   {endpoint.url}: {endpoint.served} served, {endpoint.failures} failed, "
+                  f"{state} ({downtime:.0f}s down)")
+
+
+POOL = BackendPool()
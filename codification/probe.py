@@ -0,0 +1,100 @@
+import json
+import uuid
+import requests
+
+from codification.client import post_json
+from codification.ollama import API_URL, MODEL
+
+# Probe result per (api_url, model): a process probes each model once
+PROBE_RESULTS = {}
+
+
+def probe_statelessness(api_url=API_URL, model=MODEL):
+    """
+    Check that /api/generate keeps no memory between calls (others/test.py did
+    this by hand with follow-up questions). A random code word is given in one
+    call and asked for in the next; the server is stateless if it cannot repeat it.
+    Returns True (stateless), False (state leaked) or None (probe failed).
+    """
+    code_word = f"zebra-{uuid.uuid4().hex[:8]}"
+    messages = [
+        f"Remember this code word for later: {code_word}. Reply only with OK.",
+        "What code word did I ask you to remember? Reply only with the code word, or 'none' if there is none.",
+    ]
+    answers = []
+    for prompt in messages:
+        data_payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": False,
+            "options": {"temperature": 0.0, "num_predict": 16},
+        }
+        try:
+            answers.append(post_json(api_url, data_payload).get("response", ""))
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as err:
+            print(f"⚠️ Statelessness probe failed: {err}")
+            return None
+    return code_word not in answers[-1]
+
+
+def is_stateless(api_url=API_URL, model=MODEL):
+    """
+    probe_statelessness() of 'model', run on the first call only.
+    """
+    if (api_url, model) not in PROBE_RESULTS:
+        PROBE_RESULTS[(api_url, model)] = probe_statelessness(api_url, model)
+    return PROBE_RESULTS[(api_url, model)]
+
+
+class ContextReset:
+    """
+    Replacement for the per-row reset_ollama_context() calls.
+
+    The probe runs once per model, when the first object is created. If the
+    server is stateless every reset is skipped; otherwise (or if the probe
+    could not run) a reset is a single-token generation with an empty context
+    instead of a full answer to "Forget all previous instructions". With
+    probe=False (a single reset per run, where the two probe calls would cost
+    more than they save) only an earlier probe result of the model is used.
+    """
+
+    def __init__(self, api_url=API_URL, model=MODEL, probe=True):
+        self.api_url = api_url
+        self.model = model
+        probed = (api_url, model) in PROBE_RESULTS
+        self.stateless = is_stateless(api_url, model) if probe else PROBE_RESULTS.get((api_url, model))
+        self.skipped = 0
+        self.sent = 0
+        if probed or not probe:
+            return
+        if self.stateless:
+            print("🧪 Statelessness probe passed: context resets are disabled")
+        else:
+            print("🧪 Statelessness probe did not pass: using single-token resets")
+
+    def reset(self):
+        """
+        Clear any previous context, unless the probe showed there is none.
+        """
+        if self.stateless:
+            self.skipped += 1
+            return
+        reset_data = {
+            "model": self.model,
+            "prompt": "Forget all previous instructions and start fresh.",
+            "context": [],
+            "stream": False,
+            "options": {"num_predict": 1},
+        }
+        try:
+            post_json(self.api_url, reset_data)
+            self.sent += 1
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            print(f"⚠️ Failed to reset Ollama context: {e}")
+
+    def report(self):
+        """
+        Print how many reset generations were avoided.
+        """
+        print(f"🧹 Context resets: {self.skipped} skipped, {self.sent} single-token resets sent "
+              f"(probe: {'stateless' if self.stateless else 'not verified'})")
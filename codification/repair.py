@@ -0,0 +1,87 @@
+"""
+Re-code only the 'Error' and blank cells of a finished workbook.
+
+Loads build_prompt() and EXCEL_FILE_PATH from a coding script (e.g.
+Full/ZS_Llama_Demhaic2_Full.py), reports the cells of the Codification sheet
+without a 0/1 per construct and sends just those again through run_coding()
+with resume=True, bypassing the response cache.
+
+Usage: python -m codification.repair Full/ZS_Llama_Demhaic2_Full.py
+       [--workbook Zero.xlsx] [--score] [--dry-run]
+"""
+import os
+import argparse
+import importlib.util
+import pandas as pd
+
+from codification.pipeline import CODE_COLUMNS, ROW_FIELDS, run_coding
+from codification.resume import missing_cells
+
+
+def load_script(path):
+    """
+    Import a coding script without running its main().
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(f"repair_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def activity_rows(codif_sheet):
+    """
+    Rows below the header that hold an activity (any of the ROW_FIELDS text).
+    """
+    fields = [col for col in ROW_FIELDS.values() if col < codif_sheet.shape[1]]
+    has_text = codif_sheet.iloc[:, fields].notna().any(axis=1)
+    return [i for i in range(1, len(codif_sheet)) if has_text.iat[i]]
+
+
+def scan(excel_path, code_columns=CODE_COLUMNS):
+    """
+    Return (rows, code_columns, missing) of the cells of 'excel_path' still to code.
+    """
+    codif_sheet = pd.read_excel(excel_path, sheet_name="Codification", header=None)
+    code_columns = [col for col in code_columns if col < codif_sheet.shape[1]]
+    rows = activity_rows(codif_sheet)
+    missing = missing_cells(codif_sheet, rows, code_columns)
+
+    print(f"🔍 {excel_path}: {len(rows)} rows x {len(code_columns)} constructs, "
+          f"{len(missing['error'])} Error and {len(missing['blank'])} blank cells")
+    for code_col in code_columns:
+        errors = sum(1 for _, col in missing["error"] if col == code_col)
+        blanks = sum(1 for _, col in missing["blank"] if col == code_col)
+        if errors or blanks:
+            print(f"   {str(codif_sheet.iloc[0, code_col]).strip()}: {errors} Error, {blanks} blank")
+    return rows, code_columns, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-code the Error and blank cells of a coded workbook")
+    parser.add_argument("script", help="coding script with build_prompt() and EXCEL_FILE_PATH")
+    parser.add_argument("--workbook", help="workbook to repair (default: the script's EXCEL_FILE_PATH)")
+    parser.add_argument("--score", action="store_true", help="also write P(\"1\") to the Probability sheet")
+    parser.add_argument("--dry-run", action="store_true", help="only report the cells to repair")
+    args = parser.parse_args()
+
+    script = load_script(args.script)
+    excel_path = args.workbook or script.EXCEL_FILE_PATH
+    rows, code_columns, missing = scan(excel_path)
+    cells = missing["error"] + missing["blank"]
+    if not cells:
+        print("✅ Nothing to repair")
+        return
+    if args.dry_run:
+        return
+
+    # Only the rows and constructs with a missing cell; resume skips the rest
+    repair_rows = sorted({i for i, _ in cells})
+    repair_columns = sorted({col for _, col in cells})
+    run_coding(excel_path, script.build_prompt, rows=repair_rows, code_columns=repair_columns,
+               resume=True, score=args.score, bypass=True)
+    scan(excel_path, code_columns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import pandas as pd
+
+VALID_CODES = ("0", "1")
+
+
+def is_valid_code(value):
+    """
+    True if a cell already holds a usable answer: 0/1 as int, float or text.
+    Blank cells and 'Error' are not valid.
+    """
+    if pd.isna(value):
+        return False
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip() in VALID_CODES
+
+
+def completed_cells(codif_sheet, rows, code_columns):
+    """
+    Return the set of (row, code_col) pairs of the Codification sheet that
+    already hold a valid 0/1, using the same 0-based indices as the jobs.
+    """
+    done = set()
+    for code_col in code_columns:
+        column = codif_sheet.iloc[:, code_col]
+        for i in rows:
+            if i < len(column) and is_valid_code(column.iat[i]):
+                done.add((i, code_col))
+    return done
+
+
+def missing_cells(codif_sheet, rows, code_columns):
+    """
+    Return the (row, code_col) pairs that still need a code, split into
+    'error' (the cell says Error) and 'blank' (anything else without a 0/1).
+    """
+    missing = {"error": [], "blank": []}
+    for code_col in code_columns:
+        column = codif_sheet.iloc[:, code_col]
+        for i in rows:
+            value = column.iat[i] if i < len(column) else None
+            if is_valid_code(value):
+                continue
+            kind = "error" if str(value).strip().lower() == "error" else "blank"
+            missing[kind].append((i, code_col))
+    return missing
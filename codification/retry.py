@@ -0,0 +1,147 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+
+from codification.logs import logger
+
+# Attempts per request before the cell is written as 'Error'
+MAX_ATTEMPTS = int(os.environ.get("CODING_MAX_ATTEMPTS", "5"))
+
+# Attempts a cell gets in the main pass of run_coding(); after that it is
+# deferred to a retry pass at the end, with MAX_ATTEMPTS attempts again
+INLINE_ATTEMPTS = int(os.environ.get("CODING_INLINE_ATTEMPTS", "2"))
+
+# Backoff before attempt n+1: a random delay in [0, min(BACKOFF_CAP, BACKOFF_BASE * 2**n)]
+# seconds ("full jitter"), so failed requests do not all come back at once.
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 60.0
+
+# Deadline of one attempt in seconds. A one-token answer from a loaded 70B model
+# takes seconds; a request still running after this is abandoned and retried.
+REQUEST_DEADLINE = float(os.environ.get("CODING_REQUEST_DEADLINE", "300"))
+
+# Circuit breaker: dispatch pauses when at least BREAKER_THRESHOLD of the last
+# BREAKER_WINDOW attempts failed (and at least BREAKER_MIN_CALLS were made).
+BREAKER_WINDOW = 20
+BREAKER_MIN_CALLS = 10
+BREAKER_THRESHOLD = 0.5
+
+# First pause in seconds; doubled each time a probe request fails, up to the cap
+BREAKER_COOLDOWN = 15.0
+BREAKER_COOLDOWN_CAP = 300.0
+
+# How often the requests held back during a probe check whether it is over
+BREAKER_PROBE_WAIT = 1.0
+
+
+class RetryLater(Exception):
+    """
+    Raised by a send() function for a failed attempt that should be retried
+    after 'delay' seconds. The engine frees the in-flight slot while it waits.
+    """
+
+    def __init__(self, delay):
+        super().__init__(f"retry in {delay:.1f}s")
+        self.delay = delay
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """
+    Jittered exponential backoff after the failed attempt number 'attempt' (0-based).
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Pauses dispatch when too many recent attempts failed. While open, pause()
+    tells callers how long to wait. After the cooldown, one probe request goes
+    through ("half-open"). If it succeeds, dispatch resumes. If it fails, the
+    breaker opens again with twice the cooldown.
+    """
+
+    def __init__(self, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS, threshold=BREAKER_THRESHOLD,
+                 cooldown=BREAKER_COOLDOWN, cooldown_cap=BREAKER_COOLDOWN_CAP):
+        self.outcomes = deque(maxlen=window)
+        self.min_calls = min_calls
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown_cap = cooldown_cap
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.open_until = 0.0
+        self.opened = 0
+        self.paused = 0.0
+        self.lock = threading.Lock()
+
+    def pause(self):
+        """
+        Seconds to wait before sending a request (0: go ahead).
+        """
+        with self.lock:
+            if self.state == "closed":
+                return 0.0
+            if self.state == "half-open":
+                return BREAKER_PROBE_WAIT
+            wait = self.open_until - time.monotonic()
+            if wait > 0:
+                return wait
+            # Cooldown over: this caller sends the probe, the others keep waiting
+            self.state = "half-open"
+            return 0.0
+
+    def wait(self):
+        """
+        Blocking version of pause(), for callers outside the engine.
+        """
+        while (delay := self.pause()) > 0:
+            time.sleep(delay)
+
+    def record(self, ok):
+        """
+        Record the outcome of an attempt: True, False, or None when it never
+        reached the backend (answered from the cache).
+        """
+        with self.lock:
+            if ok is None:
+                if self.state == "half-open":
+                    # The probe proved nothing: let the next request probe instead
+                    self.state = "open"
+                    self.open_until = time.monotonic()
+                return
+            if self.state == "half-open":
+                if ok:
+                    self.close_locked()
+                else:
+                    self.cooldown = min(self.cooldown_cap, self.cooldown * 2)
+                    self.open_locked()
+                return
+            if self.state == "open":
+                return
+            self.outcomes.append(ok)
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.threshold:
+                self.open_locked()
+
+    def open_locked(self):
+        self.state = "open"
+        self.open_until = time.monotonic() + self.cooldown
+        self.opened += 1
+        self.paused += self.cooldown
+        self.outcomes.clear()
+        logger.warning(f"⛔ Too many failed requests: pausing dispatch for {self.cooldown:.0f}s")
+
+    def close_locked(self):
+        self.state = "closed"
+        self.cooldown = self.base_cooldown
+        self.outcomes.clear()
+        logger.warning("✅ Backend answering again: dispatch resumed")
+
+    def report(self):
+        if self.opened:
+            print(f"⛔ Circuit breaker opened {self.opened} times (~{self.paused:.0f}s of paused dispatch)")
+
+
+BREAKER = CircuitBreaker()
@@ -0,0 +1,143 @@
+import os
+import re
+import glob
+import hashlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from codification.agreement import label_matrix
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Result workbooks compared by the all-runs agreement matrix
+RESULT_PATTERNS = [
+    "Baker2/*.xlsx",
+    "Baker5/*.xlsx",
+    "Demhaic2/All_demhaic2_*.xlsx",
+    "Demhaic5/*.xlsx",
+    "ChatGPT/Results/*.xlsx",
+    "Newfull/*.xlsx",
+]
+
+CODE_COLUMNS = list(range(6, 19))  # Columns G to S
+KEY_COLUMNS = [0, 2, 3]            # Lesson title, activity name, activity description
+
+# One result workbook: human labels, model labels and the text keys of both sheets
+Run = namedtuple("Run", ["name", "human_keys", "human", "keys", "labels", "constructs", "human_hash"])
+
+# Runs sharing the same human labels, aligned on the same rows and constructs.
+# 'labels' is (runs x rows x constructs), NaN where a run has no valid label;
+# 'labelled' is the number of aligned rows with at least one label, per run.
+Dataset = namedtuple("Dataset", ["name", "runs", "constructs", "human", "labels", "labelled"])
+
+
+def result_files(patterns=RESULT_PATTERNS, root=REPO_DIR):
+    """
+    All result workbooks matching 'patterns', relative to 'root'.
+    """
+    files = []
+    for pattern in patterns:
+        files.extend(sorted(glob.glob(os.path.join(root, pattern))))
+    return files
+
+
+def row_keys(sheet):
+    """
+    Key of every data row: lesson title, activity name and description with
+    whitespace collapsed, plus an occurrence number for repeated rows.
+    Returns None if the sheet has no text in those columns.
+    """
+    text = sheet.iloc[1:, KEY_COLUMNS]
+    if text.notna().sum().sum() == 0:
+        return None
+    text = text.fillna("").astype(str).apply(lambda row: "|".join(" ".join(value.split()) for value in row), axis=1)
+    occurrence = text.groupby(text).cumcount().astype(str)
+    return (text + "#" + occurrence).tolist()
+
+
+def load_run(path, root=REPO_DIR):
+    """
+    Read the human and Codification sheets of a result workbook.
+    """
+    sheets = pd.read_excel(path, sheet_name=None, header=None)
+    human_sheet = next(sheet for name, sheet in sheets.items() if name.lower() == "human")
+    codif_sheet = sheets["Codification"]
+    constructs = [str(name).strip().lower() for name in human_sheet.iloc[0, CODE_COLUMNS]]
+    human = label_matrix(human_sheet, slice(1, None), CODE_COLUMNS)
+    return Run(
+        name=os.path.splitext(os.path.relpath(path, root))[0],
+        human_keys=row_keys(human_sheet),
+        human=human,
+        keys=row_keys(codif_sheet),
+        labels=label_matrix(codif_sheet, slice(1, None), CODE_COLUMNS),
+        constructs=constructs,
+        human_hash=hashlib.sha256(np.nan_to_num(human, nan=-1).tobytes()).hexdigest(),
+    )
+
+
+def load_runs(paths, workers=None):
+    """
+    Read all result workbooks in parallel (parsing .xlsx is CPU bound).
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(load_run, paths))
+
+
+def aligned_labels(run, reference_keys, constructs):
+    """
+    Model labels of 'run' on the reference rows and constructs, NaN where missing.
+    Runs without text are aligned by position.
+    """
+    frame = pd.DataFrame(run.labels, columns=run.constructs)
+    if reference_keys is None or run.keys is None:
+        rows = len(reference_keys) if reference_keys is not None else len(run.human)
+        frame = frame.reindex(index=range(rows))
+    else:
+        frame.index = run.keys
+        frame = frame.reindex(index=reference_keys)
+    return frame.reindex(columns=constructs).to_numpy(dtype=float)
+
+
+def group_runs(runs):
+    """
+    Group runs by their human labels and align every group on common rows and
+    constructs. The row keys come from the first human sheet with text, or
+    else from the first Codification sheet with text.
+    """
+    groups = {}
+    for run in runs:
+        groups.setdefault(run.human_hash, []).append(run)
+
+    datasets = []
+    for number, members in enumerate(groups.values(), start=1):
+        reference = next((run for run in members if run.human_keys is not None), members[0])
+        reference_keys = reference.human_keys
+        if reference_keys is None:
+            reference_keys = next((run.keys for run in members if run.keys is not None), None)
+        constructs = reference.constructs
+
+        labels = np.stack([aligned_labels(run, reference_keys, constructs) for run in members])
+
+        datasets.append(Dataset(
+            name=f"Dataset {number}",
+            runs=[run.name for run in members],
+            constructs=constructs,
+            human=reference.human,
+            labels=labels,
+            labelled=(~np.isnan(labels)).any(axis=2).sum(axis=1),
+        ))
+    return datasets
+
+
+def replicate_groups(run_names):
+    """
+    Group replicate runs by name without their digits (Baker2/Zero1, Zero2 and
+    Zero3 -> Baker2/Zero). Only groups with at least two runs are returned.
+    """
+    groups = {}
+    for index, name in enumerate(run_names):
+        groups.setdefault(re.sub(r"\d+(?=[^/]*$)", "", name), []).append(index)
+    return {name: indices for name, indices in groups.items() if len(indices) > 1}
@@ -0,0 +1,75 @@
+import math
+
+# Sheet that receives P("1") next to the hard labels of the Codification sheet
+PROBABILITY_SHEET = "Probability"
+
+# Extra request fields that ask for the log-probabilities of the answer token
+OLLAMA_LOGPROB_FIELDS = {"logprobs": True, "top_logprobs": 5}
+OPENAI_LOGPROB_FIELDS = {"logprobs": True, "top_logprobs": 5, "max_tokens": 1}
+
+
+def label_probability(top_logprobs):
+    """
+    P("1") from a list of (token, logprob) candidates for the answer token,
+    renormalized over the '0' and '1' candidates (other tokens are ignored).
+    Returns None if neither label is among the candidates.
+    """
+    p0 = p1 = 0.0
+    for token, logprob in top_logprobs:
+        token = str(token).strip()
+        if token == "0":
+            p0 += math.exp(logprob)
+        elif token == "1":
+            p1 += math.exp(logprob)
+    if p0 + p1 == 0.0:
+        return None
+    return p1 / (p0 + p1)
+
+
+def ollama_label_probability(response_json):
+    """
+    P("1") from an Ollama /api/generate response requested with OLLAMA_LOGPROB_FIELDS.
+    Returns None when the server does not expose logprobs.
+    """
+    logprobs = response_json.get("logprobs") or []
+    if not logprobs:
+        return None
+    first = logprobs[0]
+    candidates = first.get("top_logprobs") or [first]
+    return label_probability((item.get("token"), item.get("logprob")) for item in candidates)
+
+
+def openai_label_probability(response_json):
+    """
+    P("1") from an OpenAI chat completion requested with OPENAI_LOGPROB_FIELDS.
+    Returns None when the response has no logprobs.
+    """
+    choice = (response_json.get("choices") or [{}])[0]
+    content = (choice.get("logprobs") or {}).get("content") or []
+    if not content:
+        return None
+    first = content[0]
+    candidates = first.get("top_logprobs") or [first]
+    return label_probability((item.get("token"), item.get("logprob")) for item in candidates)
+
+
+def has_openai_label(response_json):
+    """
+    True if an OpenAI chat completion has message content starting with a 0/1 label.
+    """
+    choice = (response_json.get("choices") or [{}])[0]
+    content = str((choice.get("message") or {}).get("content") or "").strip()
+    return content[:1] in ("0", "1")
+
+
+def probability_sheet(workbook, source_sheet="Codification"):
+    """
+    Return the PROBABILITY_SHEET of 'workbook', creating it with the header row
+    of 'source_sheet' if it does not exist yet.
+    """
+    if PROBABILITY_SHEET in workbook.sheetnames:
+        return workbook[PROBABILITY_SHEET]
+    sheet = workbook.create_sheet(PROBABILITY_SHEET)
+    for header in workbook[source_sheet][1]:
+        sheet.cell(row=1, column=header.column, value=header.value)
+    return sheet
@@ -0,0 +1,69 @@
+import time
+import atexit
+
+# Save the workbook after this many cell updates or this many seconds,
+# whichever comes first. Every save re-serializes the whole xlsx file.
+FLUSH_EVERY = 100
+FLUSH_INTERVAL = 60.0
+
+
+class ResultSink:
+    """
+    Write-behind buffer for cell updates.
+
+    write() only records the update in memory; the updates are applied to the
+    workbook and the file is saved once FLUSH_EVERY updates are pending or
+    FLUSH_INTERVAL seconds have passed since the last save. close() always does
+    a final flush, and is also registered with atexit so an interrupted run
+    keeps everything that was already answered.
+    """
+
+    def __init__(self, workbook, excel_path, flush_every=FLUSH_EVERY, flush_interval=FLUSH_INTERVAL):
+        self.workbook = workbook
+        self.excel_path = excel_path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.pending = []
+        self.cells_written = 0
+        self.flush_count = 0
+        self.flush_time = 0.0
+        self.last_flush = time.monotonic()
+        self.closed = False
+        atexit.register(self.close)
+
+    def write(self, sheet_name, row, column, value):
+        """
+        Queue 'value' for cell (row, column) of 'sheet_name' (1-based, like openpyxl).
+        """
+        self.pending.append((sheet_name, row, column, value))
+        if (len(self.pending) >= self.flush_every
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """
+        Apply all pending updates and save the workbook once.
+        """
+        if not self.pending:
+            return
+        started = time.perf_counter()
+        for sheet_name, row, column, value in self.pending:
+            self.workbook[sheet_name].cell(row=row, column=column, value=value)
+        self.workbook.save(self.excel_path)
+        self.flush_time += time.perf_counter() - started
+        self.flush_count += 1
+        self.cells_written += len(self.pending)
+        self.pending = []
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        """
+        Final flush; safe to call more than once.
+        """
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        atexit.unregister(self.close)
+        print(f"💾 {self.cells_written} cells written in {self.flush_count} saves "
+              f"({self.flush_time:.1f}s spent saving)")
@@ -0,0 +1,45 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Time and number of calls accumulated per pipeline stage (load, clean,
+    prompt, request, parse, write). Requests run in the engine's worker
+    threads, so the 'request' total is the sum over concurrent calls, not wall
+    time. Safe to use from any thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seconds = {}
+        self.calls = {}
+
+    def reset(self):
+        with self.lock:
+            self.seconds = {}
+            self.calls = {}
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    @contextmanager
+    def time(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def snapshot(self):
+        """
+        {stage: {"seconds": ..., "calls": ...}} of everything timed so far.
+        """
+        with self.lock:
+            return {stage: {"seconds": seconds, "calls": self.calls[stage]} for stage, seconds in self.seconds.items()}
+
+
+STAGES = StageTimer()
@@ -0,0 +1,148 @@
+import os
+import json
+import pandas as pd
+import requests
+from datetime import datetime
+
+from codification.cache import ResponseCache, cached_post
+from codification.engine import CodingJob, NUM_PARALLEL, run_jobs
+from codification.ollama import API_URL, MODEL
+from codification.pipeline import load_workbook_with_values
+from codification.probe import ContextReset
+from codification.textcache import CleanTextCache
+
+title_col = 0        # Column A
+description_col = 3  # Column D
+content_col = 4      # Column E
+summary_col = 5      # Column F (where summaries will be stored)
+
+# Number of previous items summarized for each row
+WINDOW_SIZE = 3
+
+# Summaries only depend on the model, the prompt and the cleaned window texts, so
+# Context1/2/3 workbooks with the same activities reuse them. They are kept in
+# the shared response cache file, but LLM_CACHE_BYPASS (meant for coding
+# replicates) does not apply: set SUMMARY_CACHE_BYPASS=1 to regenerate them.
+SUMMARY_BACKEND = "ollama-summary"
+SUMMARY_CACHE_BYPASS = os.environ.get("SUMMARY_CACHE_BYPASS", "0") == "1"
+SUMMARY_CACHE = ResponseCache(name="Summary cache")
+
+
+def summary_windows(codif_sheet, rows, text_cache, per_lesson=True):
+    """
+    Return [(row, lesson, last_descriptions, last_contents)] with the sliding
+    window of up to WINDOW_SIZE cleaned descriptions/contents for every row.
+    With 'per_lesson' the window restarts for every lesson title and rows without
+    a title are skipped (generateContext2.py); otherwise one window runs over all
+    rows (generateContext.py). The windows only depend on the source text, so the
+    summaries of all rows can be generated independently.
+    """
+    previous_entries = {}
+    windows = []
+    for i in rows:
+        item_title = codif_sheet.iloc[i, title_col]
+        item_description = codif_sheet.iloc[i, description_col]
+        item_content = codif_sheet.iloc[i, content_col]
+
+        if pd.isna(item_title) and per_lesson:
+            continue
+        title_key = str(item_title).strip() if pd.notna(item_title) else None
+
+        entry = previous_entries.setdefault(title_key if per_lesson else None, {"descriptions": [], "contents": []})
+        if pd.notna(item_description):
+            entry["descriptions"] = (entry["descriptions"] + [text_cache.clean(item_description)])[-WINDOW_SIZE:]
+        if pd.notna(item_content):
+            entry["contents"] = (entry["contents"] + [text_cache.clean(item_content)])[-WINDOW_SIZE:]
+
+        windows.append((i, title_key, entry["descriptions"], entry["contents"]))
+    return windows
+
+
+def summary_prompt(last_descriptions, last_contents):
+    """
+    Prompt asking for a 50-word summary of the items in the window.
+    """
+    summary_text = " | ".join([f"Item{i}.Task description: {desc}\nItem{i}.embedded_artifact_description: {cont}"
+                               for i, (desc, cont) in enumerate(zip(last_descriptions, last_contents), start=1)])
+
+    return (
+        "Provide a summary of the instructions provided to the students and the embedded artifacts in the following items. "
+        "The text should not take more than 50 words.\n\n"
+        f"Text: `{summary_text}`"
+    )
+
+
+def generate_summary(last_descriptions, last_contents, model=MODEL, api_url=API_URL, bypass=SUMMARY_CACHE_BYPASS):
+    """
+    Generate the summary of one window with Llama, or reuse the cached one.
+    """
+    if not last_descriptions and not last_contents:
+        return "No previous context available."
+
+    data = {
+        "model": model,
+        "prompt": summary_prompt(last_descriptions, last_contents),
+        "temperature": 0.0,
+        "stream": False
+    }
+
+    try:
+        response_json = cached_post(api_url, data, backend=SUMMARY_BACKEND, bypass=bypass, cache=SUMMARY_CACHE)
+    except (requests.exceptions.RequestException, json.JSONDecodeError):
+        return "Error generating summary."
+    return response_json.get("response", "No summary available.").strip()
+
+
+def run_summaries(excel_path, rows, per_lesson=True, model=MODEL, api_url=API_URL, max_in_flight=NUM_PARALLEL):
+    """
+    Fill column F of the "Codification" sheet with the summary of the previous
+    items of every row. Summaries are generated concurrently (up to
+    'max_in_flight' requests, by default what the single 'api_url' server
+    serves at once) and written to the workbook in a single save.
+    """
+    Starting_time = datetime.now()
+    print(f"\n✅ Starting time: '{Starting_time}'")
+
+    # Load the Context sheet
+    codif_sheet = pd.read_excel(excel_path, sheet_name="Codification", header=None)
+
+    # Load workbook for writing results
+    workbook = load_workbook_with_values(excel_path)
+    if "Codification" not in workbook.sheetnames:
+        raise ValueError("❌ Sheet 'Codification' not found in the Excel file!")
+    workbook_sheet = workbook["Codification"]
+
+    # Reset Llama memory before starting: one single-token call, no probe
+    # (skipped if this process already verified the server is stateless)
+    context_reset = ContextReset(api_url, model, probe=False)
+    context_reset.reset()
+
+    text_cache = CleanTextCache(excel_path)
+    windows = summary_windows(codif_sheet, rows, text_cache, per_lesson)
+    text_cache.save()
+    lessons = len({lesson for _, lesson, _, _ in windows})
+    print(f"📤 Generating {len(windows)} summaries for {lessons} lessons with up to {max_in_flight} in flight")
+
+    jobs = [CodingJob(i, summary_col, lesson, (descriptions, contents))
+            for i, lesson, descriptions, contents in windows]
+    summaries = {}
+
+    def collect(job, summary):
+        print(f"📝 Row {job.row+1} - Generated Summary: {summary}")
+        summaries[job.row] = summary
+
+    try:
+        run_jobs(jobs, lambda job: generate_summary(*job.payload, model=model, api_url=api_url), collect, max_in_flight)
+    finally:
+        # Write all summaries to column F in row order and save once
+        for i in sorted(summaries):
+            workbook_sheet.cell(row=i+1, column=summary_col+1, value=summaries[i])
+        workbook.save(excel_path)
+        workbook.close()
+        SUMMARY_CACHE.report()
+
+    Finishing_time = datetime.now()
+    print("\n✅ Summaries successfully written to the Excel file.")
+    print(f"\n✅ Starting time: '{Starting_time}'")
+    print(f"\n✅ Finishing time: '{Finishing_time}'")
+    return summaries
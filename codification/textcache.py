@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+from bs4 import BeautifulSoup
+
+# Cleaned texts are stored next to the workbooks in this file, so the ZS, FS
+# and Context runs of a folder (and every construct of each run) share them.
+CACHE_FILE_NAME = "clean_text_cache.json"
+
+# Part of every key: change it when clean_html() changes to invalidate old entries
+CLEANER_VERSION = "bs4/html.parser/get_text"
+
+
+def clean_html(html_text):
+    """
+    Remove any HTML tags from the input text.
+    """
+    return BeautifulSoup(str(html_text), "html.parser").get_text()
+
+
+def text_key(value):
+    """
+    Content hash used as the cache key of a raw cell value.
+    """
+    return hashlib.sha256(f"{CLEANER_VERSION}\0{value}".encode("utf-8")).hexdigest()
+
+
+class CleanTextCache:
+    """
+    Table of cleaned texts keyed by the SHA-256 of the raw cell content,
+    persisted as JSON beside the workbook together with the total number of
+    parses and time they took (used to estimate the time saved on later runs).
+    """
+
+    def __init__(self, excel_path):
+        self.path = os.path.join(os.path.dirname(os.path.abspath(excel_path)), CACHE_FILE_NAME)
+        self.table = {}
+        self.total_parses = 0
+        self.total_parse_time = 0.0
+        self.hits = 0
+        self.parses = 0
+        self.parse_time = 0.0
+        self.reads = 0
+        self.dirty = False
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as cache_file:
+                    stored = json.load(cache_file)
+                self.table = stored["texts"]
+                self.total_parses = stored["parses"]
+                self.total_parse_time = stored["parse_seconds"]
+            except (OSError, ValueError, KeyError) as err:
+                print(f"⚠️ Ignoring unreadable text cache {self.path}: {err}")
+
+    def clean(self, value):
+        """
+        Return clean_html(value), parsing it only if this content was never seen.
+        """
+        key = text_key(value)
+        cleaned = self.table.get(key)
+        if cleaned is not None:
+            self.hits += 1
+            return cleaned
+        started = time.perf_counter()
+        cleaned = clean_html(value)
+        elapsed = time.perf_counter() - started
+        self.parse_time += elapsed
+        self.parses += 1
+        self.total_parse_time += elapsed
+        self.total_parses += 1
+        self.table[key] = cleaned
+        self.dirty = True
+        return cleaned
+
+    def save(self):
+        """
+        Write the table back to disk if new texts were cleaned.
+        """
+        if not self.dirty:
+            return
+        # A temp file of its own: the ZS, FS and Context runs of a folder may
+        # save the shared file at the same time
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as cache_file:
+                json.dump({"parses": self.total_parses, "parse_seconds": self.total_parse_time,
+                           "texts": self.table}, cache_file, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.dirty = False
+
+    def report(self):
+        """
+        Print how much HTML parsing the cache avoided. Without it every read of a
+        cleaned field by a prompt would have been its own BeautifulSoup parse.
+        """
+        per_parse = self.total_parse_time / self.total_parses if self.total_parses else 0.0
+        saved = max(0, self.reads - self.parses) * per_parse
+        print(f"🧽 Cleaned {self.parses} texts in {self.parse_time:.2f}s ({self.hits} cache hits, {self.path}); "
+              f"prompts read {self.reads} cleaned fields, ~{saved:.2f}s of parsing saved")
+
+
+class CleanRow(dict):
+    """
+    Row dict that counts reads of the cleaned fields, for CleanTextCache.report().
+    """
+
+    def __init__(self, fields, cache, cleaned_fields):
+        super().__init__(fields)
+        self.cache = cache
+        self.cleaned_fields = cleaned_fields
+
+    def __getitem__(self, field):
+        if field in self.cleaned_fields:
+            self.cache.reads += 1
+        return super().__getitem__(field)
@@ -0,0 +1,75 @@
+import os
+import json
+import time
+import threading
+import requests
+
+from codification.client import post_json
+from codification.logs import logger
+
+# How long Ollama keeps the model in memory after each request. Every coding
+# request carries it, so the model stays resident for the whole run and for
+# this long after the last call (e.g. for the next script chained on the box).
+KEEP_ALIVE = os.environ.get("CODING_KEEP_ALIVE", "30m")
+
+# A load_duration above this (in seconds) after warm-up means the model was reloaded
+RELOAD_THRESHOLD = 1.0
+
+
+class ResidencyMonitor:
+    """
+    Watches the load_duration of fresh Ollama responses and warns when the
+    model had to be loaded again after the warm-up.
+    """
+
+    def __init__(self):
+        self.warm = False
+        self.startup_load = None
+        self.reloads = 0
+        self.reload_time = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, response_json, row_idx, code_name):
+        load_seconds = response_json.get("load_duration", 0) / 1e9
+        if not self.warm or load_seconds < RELOAD_THRESHOLD:
+            return
+        with self.lock:
+            self.reloads += 1
+            self.reload_time += load_seconds
+        logger.warning(f"⚠️ Model reloaded mid-run ({load_seconds:.1f}s load) before row {row_idx+1}, code '{code_name}'")
+
+    def report(self):
+        if self.startup_load is None and self.reloads == 0:
+            return
+        startup = f"{self.startup_load:.1f}s at startup" if self.startup_load is not None else "no warm-up"
+        print(f"🔥 Model loads: {startup}, {self.reloads} reloads mid-run ({self.reload_time:.1f}s)")
+
+
+RESIDENCY = ResidencyMonitor()
+
+
+def warm_up_model(api_url, model, keep_alive=KEEP_ALIVE):
+    """
+    Load 'model' before the coding loop starts and pin it with 'keep_alive',
+    so the first real request does not pay the load time. Records the
+    load_duration reported by the server.
+    """
+    data_payload = {
+        "model": model,
+        "prompt": "Reply only with OK.",
+        "stream": False,
+        "keep_alive": keep_alive,
+        "options": {"num_predict": 1},
+    }
+    started = time.perf_counter()
+    try:
+        response_json = post_json(api_url, data_payload)
+    except (requests.exceptions.RequestException, json.JSONDecodeError) as err:
+        print(f"⚠️ Model warm-up failed: {err}")
+        return None
+    load_seconds = response_json.get("load_duration", 0) / 1e9
+    RESIDENCY.startup_load = load_seconds
+    RESIDENCY.warm = True
+    print(f"🔥 Model '{model}' ready: {load_seconds:.1f}s load, {time.perf_counter() - started:.1f}s first call, "
+          f"kept alive for {keep_alive}")
+    return load_seconds
@@ -3,6 +3,11 @@ import requests
 import json
 from datetime import datetime
 import os
+import sys
+
+# Shared codification helpers live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from codification.client import post_json
 
 # Enable GPU usage for Ollama (if supported)
 os.environ["OLLAMA_USE_CUDA"] = "1"
@@ -37,9 +42,7 @@ for i in range(3):  # Loop from 0 to 2 (three iterations)
     
     for attempt in range(MAX_RETRIES):
         try:
-            response = requests.post(API_URL, headers={'Content-Type': 'application/json'}, json=data_payload)
-            response.raise_for_status()
-            response_json = response.json()
+            response_json = post_json(API_URL, data_payload)
             api_response = response_json.get("response", "").strip()
             
             print(f"\n📝 Message {i+1}: {prompt}")